@@ -0,0 +1,127 @@
+import os
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import DateTime, case, func, null, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.models import Route, Trip
+
+# Viagens atualizadas por comando (e por transação) no recálculo das chegadas
+TRIP_ARRIVAL_CHUNK_SIZE = int(os.getenv("TRIP_ARRIVAL_CHUNK_SIZE", "5000"))
+# Rotas por comando: mantém o IN (...) bem abaixo do limite de parâmetros
+ROUTE_IDS_PER_STATEMENT = 1000
+
+
+class _AddMinutes(FunctionElement):
+    """add_minutes(data, minutos), compilado para o dialeto do banco"""
+
+    type = DateTime()
+    name = "add_minutes"
+    inherit_cache = True
+
+
+@compiles(_AddMinutes)
+def _add_minutes_postgresql(element, compiler, **kw):
+    moment, minutes = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"{moment} + INTERVAL '1 minute' * {minutes}"
+
+
+@compiles(_AddMinutes, "sqlite")
+def _add_minutes_sqlite(element, compiler, **kw):
+    # O SQLAlchemy grava DateTime no SQLite como 'AAAA-MM-DD HH:MM:SS.ffffff':
+    # soma os minutos na parte inteira e mantém os microssegundos da partida,
+    # para a comparação com o arrival_time gravado ser exata
+    moment, minutes = (compiler.process(clause, **kw) for clause in element.clauses)
+    return (
+        f"strftime('%Y-%m-%d %H:%M:%S', {moment}, '+' || {minutes} || ' minutes')"
+        f" || substr({moment}, 20)"
+    )
+
+
+# Mesma regra de calculate_arrival_time, em SQL: partida + duração da rota,
+# ou NULL quando a rota não tem duração
+_EXPECTED_ARRIVAL = case(
+    (
+        Route.estimated_duration_min > 0,
+        _AddMinutes(Trip.departure_time, Route.estimated_duration_min),
+    ),
+    else_=null(),
+)
+
+
+def _stale_conditions(route_ids: Sequence[int], departure_from: datetime):
+    """Viagens futuras das rotas cujo arrival_time difere do calculado"""
+    return (
+        Route.id.in_(route_ids),
+        Trip.departure_time >= departure_from,
+        Trip.arrival_time.is_distinct_from(_EXPECTED_ARRIVAL),
+    )
+
+
+def _batches(route_ids: Sequence[int]):
+    route_ids = sorted(set(route_ids))
+    for start in range(0, len(route_ids), ROUTE_IDS_PER_STATEMENT):
+        yield route_ids[start:start + ROUTE_IDS_PER_STATEMENT]
+
+
+async def count_stale_arrivals(
+    db: AsyncSession, route_ids: Sequence[int], departure_from: Optional[datetime] = None
+) -> int:
+    """Prévia (dry-run): quantas viagens recompute_arrival_times alteraria"""
+    departure_from = departure_from or datetime.utcnow()
+    total = 0
+    for batch in _batches(route_ids):
+        total += await db.scalar(
+            select(func.count()).select_from(Trip).join(Route, Trip.route_id == Route.id).where(
+                *_stale_conditions(batch, departure_from)
+            )
+        )
+    return total
+
+
+async def recompute_arrival_times(
+    db: AsyncSession,
+    route_ids: Sequence[int],
+    departure_from: Optional[datetime] = None,
+    chunk_size: int = TRIP_ARRIVAL_CHUNK_SIZE,
+) -> int:
+    """
+    Recalcula o arrival_time das viagens futuras das rotas no banco.
+
+    Cada bloco é um único UPDATE ... FROM routes (partida + duração da
+    rota), sem carregar viagens na aplicação, seguido de COMMIT: rotas com
+    muitas viagens não seguram locks numa transação longa. Só as viagens
+    com chegada desatualizada entram no bloco, então o laço termina quando
+    um bloco vem incompleto. Viagens já partidas (antes de departure_from,
+    por padrão agora em UTC, como as partidas gravadas) ficam como estão.
+
+    Returns:
+        Quantidade de viagens atualizadas
+    """
+    departure_from = departure_from or datetime.utcnow()
+    total = 0
+    for batch in _batches(route_ids):
+        # Sem correlação: a subconsulta escolhe o bloco por conta própria
+        chunk = (
+            select(Trip.id)
+            .join(Route, Trip.route_id == Route.id)
+            .where(*_stale_conditions(batch, departure_from))
+            .order_by(Trip.id)
+            .limit(chunk_size)
+            .correlate(None)
+        )
+        while True:
+            result = await db.execute(
+                update(Trip)
+                .where(Trip.route_id == Route.id, Trip.id.in_(chunk.scalar_subquery()))
+                .values(arrival_time=_EXPECTED_ARRIVAL)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            total += result.rowcount
+            if result.rowcount < chunk_size:
+                break
+    return total
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Marca o fim da fila durante o shutdown
+_STOP = object()
+
+
+class AuditLogWriter:
+    """
+    Escritor assíncrono do log de validações em JSON lines.
+
+    Os registros entram numa fila limitada sem bloquear o event loop; uma
+    tarefa em background grava em lotes (por tamanho ou por tempo), numa
+    thread, e rotaciona o arquivo por tamanho. Com a fila cheia o registro
+    é descartado e contado em 'dropped'.
+    """
+
+    def __init__(self):
+        self.path = os.getenv("AUDIT_LOG_FILE", "validations.log")
+        self.max_queue = int(os.getenv("AUDIT_LOG_MAX_QUEUE", "10000"))
+        self.batch_size = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "200"))
+        self.flush_interval = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1.0"))
+        self.max_bytes = int(os.getenv("AUDIT_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.backup_count = int(os.getenv("AUDIT_LOG_BACKUP_COUNT", "5"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Inicia a tarefa de gravação (chamado no lifespan da aplicação)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Grava tudo que ainda está na fila e encerra a tarefa"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    def log(self, record: Dict[str, Any]) -> bool:
+        """
+        Enfileira um registro sem bloquear.
+
+        Returns:
+            False se o registro foi descartado por falta de espaço na fila
+        """
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        if not self.running:
+            # Fora do lifespan (scripts) grava direto, como antes
+            self._write_batch([line])
+            return True
+        try:
+            self._queue.put_nowait(line)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, lines: List[str]) -> None:
+        data = "".join(lines)
+        try:
+            if self.max_bytes > 0 and os.path.exists(self.path):
+                if os.path.getsize(self.path) + len(data.encode("utf-8")) > self.max_bytes:
+                    self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+            self.written += len(lines)
+            self.batches += 1
+        except Exception as e:
+            # Em caso de erro ao escrever no arquivo, não interrompe o fluxo
+            self.write_errors += 1
+            print(f"Erro ao salvar log: {e}")
+
+    def _rotate(self) -> None:
+        """Renomeia validations.log -> .1 -> .2 ... mantendo backup_count arquivos"""
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        else:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+        }
+
+
+def make_record(validation_type: str, details: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "type": validation_type,
+        **details,
+    }
+
+
+# Singleton instance
+audit_log = AuditLogWriter()
@@ -0,0 +1,182 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import env_bool
+from app.db import AsyncSessionLocal
+from app.models import CepCache
+
+
+class TTLLRUCache:
+    """Cache LRU limitado em memória, com expiração por entrada"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor); entradas expiradas são descartadas"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CEPCache:
+    """
+    Cache de CEP em dois níveis na frente da ViaCEP.
+
+    Nível 1: LRU em memória por processo, com TTL.
+    Nível 2: tabela 'cep_cache' no PostgreSQL, compartilhada entre workers.
+
+    Consultas que falharam de forma definitiva (CEP inexistente) são
+    cacheadas com um TTL próprio, mais curto.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.getenv("CEP_CACHE_TTL", str(7 * 24 * 3600)))
+        self.negative_ttl = float(os.getenv("CEP_CACHE_NEGATIVE_TTL", "600"))
+        self.persistent_enabled = env_bool("CEP_CACHE_PERSISTENT", True)
+        self.memory = TTLLRUCache(int(os.getenv("CEP_CACHE_MAX_ENTRIES", "10000")))
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.persistent_errors = 0
+
+    async def get(self, cep: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Busca um CEP (sem hífen) nos dois níveis.
+
+        Returns:
+            Tupla (encontrado, endereço). Endereço None com encontrado=True
+            indica um CEP sabidamente inválido (cache negativo).
+        """
+        found, address = self.memory.get(cep)
+        if found:
+            self.memory_hits += 1
+            if address is None:
+                self.negative_hits += 1
+            return True, address
+
+        if self.persistent_enabled:
+            found, address, remaining = await self._load_persistent(cep)
+            if found:
+                self.persistent_hits += 1
+                if address is None:
+                    self.negative_hits += 1
+                # Promove para a memória pelo tempo restante do registro
+                self.memory.set(cep, address, remaining)
+                return True, address
+
+        self.misses += 1
+        return False, None
+
+    async def set(self, cep: str, address: Optional[Dict[str, Any]]) -> None:
+        """Armazena uma resposta definitiva da ViaCEP nos dois níveis"""
+        ttl = self.ttl if address is not None else self.negative_ttl
+        self.memory.set(cep, address, ttl)
+        self.stores += 1
+        if self.persistent_enabled:
+            await self._store_persistent(cep, address)
+
+    async def _load_persistent(
+        self, cep: str
+    ) -> Tuple[bool, Optional[Dict[str, Any]], float]:
+        try:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(CepCache, cep)
+        except (SQLAlchemyError, OSError) as e:
+            self.persistent_errors += 1
+            print(f"Erro ao ler cache de CEP: {e}")
+            return False, None, 0.0
+
+        if row is None:
+            return False, None, 0.0
+        ttl = self.ttl if row.is_valid else self.negative_ttl
+        age = (datetime.utcnow() - row.fetched_at).total_seconds()
+        if age >= ttl:
+            return False, None, 0.0
+        if not row.is_valid:
+            return True, None, ttl - age
+        return True, {
+            "cep": cep,
+            "city": row.city,
+            "city_ibge_code": row.city_ibge_code,
+            "state": row.state,
+        }, ttl - age
+
+    async def _store_persistent(
+        self, cep: str, address: Optional[Dict[str, Any]]
+    ) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(
+                    CepCache(
+                        cep=cep,
+                        is_valid=address is not None,
+                        city=address.get("city") if address else None,
+                        city_ibge_code=address.get("city_ibge_code") if address else None,
+                        state=address.get("state") if address else None,
+                        fetched_at=datetime.utcnow(),
+                    )
+                )
+                await db.commit()
+        except (SQLAlchemyError, OSError) as e:
+            # Outro worker pode ter gravado o mesmo CEP ao mesmo tempo
+            self.persistent_errors += 1
+            print(f"Erro ao gravar cache de CEP: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache; 'viacep_calls_saved' soma os acertos dos dois níveis"""
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory_entries": len(self.memory),
+            "memory_max_entries": self.memory.max_entries,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+            "persistent_errors": self.persistent_errors,
+            "viacep_calls_saved": self.memory_hits + self.persistent_hits,
+            "hit_ratio": (
+                round((self.memory_hits + self.persistent_hits) / lookups, 4)
+                if lookups else 0.0
+            ),
+        }
+
+
+# Singleton instance
+cep_cache = CEPCache()
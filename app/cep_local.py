@@ -0,0 +1,269 @@
+"""
+Resolvedor local de CEP a partir de uma base de faixas de CEP por cidade.
+
+A importação lê um CSV com as colunas
+
+    cep_start,cep_end,city,city_ibge_code,state
+
+(ou 'cep' no lugar de cep_start/cep_end, para CEPs individuais) e grava um
+arquivo binário compacto:
+
+    cabeçalho   MAGIC, quantidade de faixas e de cidades (little-endian)
+    starts      uint32[n]  início de cada faixa, em ordem crescente
+    ends        uint32[n]  fim de cada faixa (inclusive)
+    cities      uint32[n]  índice da cidade de cada faixa
+    tabela      cidades em JSON (cidade, código IBGE, UF)
+
+Na leitura o arquivo é mapeado com mmap e a busca é um bisect sobre o
+array de inícios, sem cópia e sem rede: alguns microssegundos por CEP.
+
+Uso:
+    python -m app.cep_local import faixas_cep.csv [--output data/cep_ranges.bin]
+    python -m app.cep_local lookup 01310-100
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+CEP_LOCAL_FILE = os.getenv(
+    "CEP_LOCAL_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cep_ranges.bin"),
+)
+
+MAGIC = b"UBCEP001"
+# MAGIC, quantidade de faixas, tamanho da tabela de cidades (bytes)
+HEADER = struct.Struct("<8sII")
+
+
+def _parse_cep(value: str) -> int:
+    digits = value.strip().replace("-", "").replace(".", "")
+    if len(digits) != 8 or not digits.isdigit():
+        raise ValueError(f"CEP inválido: {value!r}")
+    return int(digits)
+
+
+def read_ranges(path: str) -> List[Tuple[int, int, Tuple[str, str, str]]]:
+    """Lê o CSV de faixas; linhas inválidas são ignoradas com aviso"""
+    ranges = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for line, row in enumerate(reader, start=2):
+            try:
+                if row.get("cep"):
+                    start = end = _parse_cep(row["cep"])
+                else:
+                    start, end = _parse_cep(row["cep_start"]), _parse_cep(row["cep_end"])
+                city = (row["city"].strip(), row["city_ibge_code"].strip(), row["state"].strip())
+            except (KeyError, AttributeError, ValueError) as e:
+                print(f"Linha {line} ignorada: {e}")
+                continue
+            if start > end or not all(city):
+                print(f"Linha {line} ignorada: faixa ou cidade inválida")
+                continue
+            ranges.append((start, end, city))
+    return ranges
+
+
+def build_file(ranges: Sequence[Tuple[int, int, Tuple[str, str, str]]], output: str) -> int:
+    """
+    Grava o arquivo binário a partir das faixas (em qualquer ordem).
+
+    Faixas sobrepostas não são permitidas: a que começa depois é descartada.
+
+    Returns:
+        Quantidade de faixas gravadas
+    """
+    starts, ends, city_ids = array("I"), array("I"), array("I")
+    cities: List[Tuple[str, str, str]] = []
+    city_index: Dict[Tuple[str, str, str], int] = {}
+
+    for start, end, city in sorted(ranges):
+        if ends and start <= ends[-1]:
+            print(f"Faixa {start:08d}-{end:08d} sobrepõe a anterior e foi ignorada")
+            continue
+        if city not in city_index:
+            city_index[city] = len(cities)
+            cities.append(city)
+        starts.append(start)
+        ends.append(end)
+        city_ids.append(city_index[city])
+
+    if sys.byteorder != "little":
+        for values in (starts, ends, city_ids):
+            values.byteswap()
+
+    table = json.dumps(cities, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp = f"{output}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(starts), len(table)))
+        starts.tofile(f)
+        ends.tofile(f)
+        city_ids.tofile(f)
+        f.write(table)
+    # Troca atômica: processos com o arquivo antigo mapeado não são afetados
+    os.replace(tmp, output)
+    return len(starts)
+
+
+class LocalCEPResolver:
+    """
+    Consulta de CEP na base local (arquivo mapeado com mmap).
+
+    Sem o arquivo, lookup() sempre retorna None e o cadastro segue pela
+    ViaCEP normalmente.
+    """
+
+    def __init__(self, path: str = CEP_LOCAL_FILE):
+        self.path = path
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._starts: Sequence[int] = ()
+        self._ends: Sequence[int] = ()
+        self._city_ids: Sequence[int] = ()
+        self._cities: List[Tuple[str, str, str]] = []
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> bool:
+        """Abre (ou reabre) o arquivo; retorna False se ele não existir ou for inválido"""
+        with self._lock:
+            self._close()
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return False
+            try:
+                self._open()
+            except (OSError, ValueError) as e:
+                print(f"Base local de CEP inválida em {self.path}: {e}")
+                self._close()
+                return False
+            return True
+
+    def _open(self) -> None:
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, table_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError("cabeçalho desconhecido")
+
+        offset = HEADER.size
+        size = count * 4
+        columns = []
+        for _ in range(3):
+            view = memoryview(self._mmap)[offset:offset + size]
+            if sys.byteorder == "little":
+                columns.append(view.cast("I"))
+            else:
+                column = array("I", view.tobytes())
+                column.byteswap()
+                columns.append(column)
+            offset += size
+        self._starts, self._ends, self._city_ids = columns
+        self._cities = [tuple(c) for c in json.loads(self._mmap[offset:offset + table_size])]
+
+    def _close(self) -> None:
+        # As views precisam ser liberadas antes de fechar o mmap
+        for view in (self._starts, self._ends, self._city_ids):
+            if isinstance(view, memoryview):
+                view.release()
+        self._starts = self._ends = self._city_ids = ()
+        self._cities = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+            self._loaded = False
+
+    def lookup(self, clean_cep: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca o CEP (8 dígitos, sem hífen) nas faixas locais.
+
+        Returns:
+            Dict no mesmo formato da ViaCEP (cep, city, city_ibge_code,
+            state) ou None se o CEP não está em nenhuma faixa
+        """
+        if not self._loaded:
+            self.load()
+        if not self._cities or not clean_cep.isdigit() or len(clean_cep) != 8:
+            self.misses += 1
+            return None
+
+        cep = int(clean_cep)
+        index = bisect_right(self._starts, cep) - 1
+        if index < 0 or cep > self._ends[index]:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        city, ibge, state = self._cities[self._city_ids[index]]
+        return {
+            "cep": f"{clean_cep[:5]}-{clean_cep[5:]}",
+            "city": city,
+            "city_ibge_code": ibge,
+            "state": state,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "file": self.path,
+            "loaded": bool(self._cities),
+            "ranges": len(self._starts),
+            "cities": len(self._cities),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Singleton instance
+local_cep_resolver = LocalCEPResolver()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Base local de CEP")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="importa um CSV de faixas de CEP")
+    import_cmd.add_argument("csv_file")
+    import_cmd.add_argument("--output", default=CEP_LOCAL_FILE)
+
+    lookup_cmd = commands.add_parser("lookup", help="consulta um CEP na base local")
+    lookup_cmd.add_argument("cep")
+    lookup_cmd.add_argument("--file", default=CEP_LOCAL_FILE)
+
+    args = parser.parse_args(argv)
+    if args.command == "import":
+        started = time.perf_counter()
+        ranges = read_ranges(args.csv_file)
+        written = build_file(ranges, args.output)
+        print(
+            f"{written} faixas gravadas em {args.output} "
+            f"({os.path.getsize(args.output)} bytes, {time.perf_counter() - started:.2f}s)"
+        )
+    else:
+        resolver = LocalCEPResolver(args.file)
+        if not resolver.load():
+            raise SystemExit(f"Base local não encontrada em {args.file}")
+        print(resolver.lookup(args.cep.replace("-", "")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.metrics import REGISTRY
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor do gauge de estado exposto em /metrics
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com janela deslizante de erros e lentidão.
+
+    Fechado: as chamadas passam e cada resultado entra numa janela dos
+    últimos CIRCUIT_WINDOW_SECONDS (um balde por segundo). Com pelo menos
+    CIRCUIT_MIN_CALLS chamadas na janela, o circuito abre se a taxa de
+    falhas ou a taxa de chamadas lentas (acima de CIRCUIT_SLOW_CALL_SECONDS)
+    passar do limite.
+
+    Aberto: allow() retorna False na hora e o chamador segue direto para o
+    fallback, sem esperar o timeout. Depois de CIRCUIT_OPEN_SECONDS o
+    circuito fica meio-aberto.
+
+    Meio-aberto: deixa passar até CIRCUIT_HALF_OPEN_PROBES chamadas de
+    teste. Se todas derem certo, fecha; qualquer falha reabre.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None,
+    ):
+        env = os.getenv
+        self.name = name
+        self.window_seconds = window_seconds or int(env("CIRCUIT_WINDOW_SECONDS", "30"))
+        self.min_calls = min_calls or int(env("CIRCUIT_MIN_CALLS", "10"))
+        self.failure_rate = failure_rate or float(env("CIRCUIT_FAILURE_RATE", "0.5"))
+        self.slow_call_seconds = slow_call_seconds or float(env("CIRCUIT_SLOW_CALL_SECONDS", "2.0"))
+        self.slow_call_rate = slow_call_rate or float(env("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+        self.open_seconds = open_seconds or float(env("CIRCUIT_OPEN_SECONDS", "15"))
+        self.half_open_probes = half_open_probes or int(env("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        # Baldes [segundo, chamadas, falhas, lentas] da janela deslizante
+        self._buckets: deque = deque()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.transitions: Dict[str, int] = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        _breakers.append(self)
+
+    def allow(self) -> bool:
+        """
+        Informa se a chamada pode seguir. Toda chamada liberada deve terminar
+        com record(), inclusive quando cancelada (success=None).
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record(self, duration: float, success: Optional[bool]) -> None:
+        """
+        Registra o resultado de uma chamada liberada por allow().
+
+        Args:
+            duration: duração da chamada em segundos
+            success: True/False, ou None se a chamada foi cancelada antes de
+                terminar (só libera a vaga de teste, sem contar na janela)
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if success is None:
+                    return
+                if not success or duration >= self.slow_call_seconds:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+
+            if success is None or self.state != CLOSED:
+                return
+            self._add_to_window(duration, success)
+            calls, failures, slow = self._window_totals()
+            if calls >= self.min_calls and (
+                failures / calls >= self.failure_rate or slow / calls >= self.slow_call_rate
+            ):
+                self._open()
+
+    def _prune(self, now: int) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+
+    def _add_to_window(self, duration: float, success: bool) -> None:
+        now = int(time.monotonic())
+        self._prune(now)
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        if not success:
+            bucket[2] += 1
+        if duration >= self.slow_call_seconds:
+            bucket[3] += 1
+
+    def _window_totals(self):
+        self._prune(int(time.monotonic()))
+        calls = failures = slow = 0
+        for _, bucket_calls, bucket_failures, bucket_slow in self._buckets:
+            calls += bucket_calls
+            failures += bucket_failures
+            slow += bucket_slow
+        return calls, failures, slow
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        print(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        self.transitions[state] += 1
+        self._buckets.clear()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, failures, slow = self._window_totals()
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "window_slow_calls": slow,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+
+_breakers: List[CircuitBreaker] = []
+
+
+REGISTRY.callback(
+    "unibus_circuit_breaker_state",
+    "Estado do circuit breaker (0 fechado, 1 meio-aberto, 2 aberto)",
+    lambda: [((b.name,), STATE_VALUES[b.state]) for b in _breakers],
+    labelnames=("name",),
+)
+REGISTRY.callback(
+    "unibus_circuit_breaker_transitions_total",
+    "Mudanças de estado do circuit breaker, pelo estado de destino",
+    lambda: [((b.name, state), count) for b in _breakers for state, count in b.transitions.items()],
+    labelnames=("name", "state"),
+    kind="counter",
+)
+REGISTRY.callback(
+    "unibus_circuit_breaker_rejected_total",
+    "Chamadas recusadas na hora (fallback imediato) com o circuito aberto",
+    lambda: [((b.name,), b.rejected) for b in _breakers],
+    labelnames=("name",),
+    kind="counter",
+)
@@ -0,0 +1,12 @@
+import os
+
+# Valores aceitos como verdadeiro nas variáveis de ambiente booleanas
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Lê uma variável de ambiente booleana ('1', 'true', 'yes' ou 'on')"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in _TRUE_VALUES
@@ -0,0 +1,79 @@
+import csv
+import io
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Literal
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.db import AsyncSessionLocal
+
+# Linhas buscadas por vez no cursor do servidor durante a exportação
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def _stream_rows(statement: Select) -> AsyncIterator[List[tuple]]:
+    """
+    Percorre o resultado com cursor do servidor, um bloco de linhas por vez.
+
+    Usa sessão própria (e não a do Depends) porque o corpo é enviado depois
+    que o handler retorna.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+
+async def _encode_ndjson(statement: Select, columns: List[str]) -> AsyncIterator[bytes]:
+    async for partition in _stream_rows(statement):
+        yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in partition)
+
+
+async def _encode_csv(statement: Select, columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for partition in _stream_rows(statement):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in partition
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Cabeçalho sozinho quando não há linhas
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_response(
+    statement: Select, export_format: ExportFormat, filename: str
+) -> StreamingResponse:
+    """
+    Resposta em streaming (NDJSON ou CSV) para uma consulta de colunas.
+
+    A memória fica constante: as linhas vêm do banco em blocos de
+    EXPORT_BATCH_SIZE e são codificadas e enviadas bloco a bloco, sem
+    objetos ORM nem modelos Pydantic intermediários.
+    """
+    columns = [column.key for column in statement.selected_columns]
+    encoder = _encode_csv if export_format == "csv" else _encode_ndjson
+    return StreamingResponse(
+        encoder(statement, columns),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
@@ -1,14 +1,19 @@
 import httpx
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
+from app.http_pool import ServiceClient, timed_request
 
-class StudentValidationClient:
+
+class StudentValidationClient(ServiceClient):
     """Cliente para integração com unibus-student-validation-api"""
 
     def __init__(self):
-        self.base_url = os.getenv("VALIDATION_API_URL", "http://localhost:8001")
-        self.timeout = float(os.getenv("VALIDATION_API_TIMEOUT", "10.0"))
+        super().__init__(
+            "validation_api",
+            timeout=float(os.getenv("VALIDATION_API_TIMEOUT", "10.0")),
+            base_url=os.getenv("VALIDATION_API_URL", "http://localhost:8001"),
+        )
 
     async def validate_student(
         self, name: str, email: str, registration: str
@@ -24,38 +29,53 @@ class StudentValidationClient:
         Returns:
             Dict com 'is_valid' e 'reason' ou None se falhar
         """
+        # Hedging e retries para timeouts, erros de rede e 5xx
+        outcome = await self._protected_call(lambda: self._request(name, email, registration))
+        if outcome is None:
+            # Circuito aberto: o cadastro segue para o fallback na hora
+            print("Validation-API: circuit breaker aberto, validação ignorada")
+            return None
+        return outcome[0]
+
+    async def _request(
+        self, name: str, email: str, registration: str
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Faz a chamada; o segundo valor indica se o serviço respondeu sem erro 5xx"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
+            client = self._get_client()
+            response = await timed_request(
+                "validation_api",
+                client.post(
                     f"{self.base_url}/validate-student",
                     json={
                         "name": name,
                         "email": email,
                         "registration": registration
                     },
-                )
+                ),
+            )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "is_valid": data.get("is_valid", False),
-                        "reason": data.get("reason", "Unknown"),
-                    }
-                else:
-                    print(
-                        f"Validation-API returned status {response.status_code}: {response.text}"
-                    )
-                    return None
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "is_valid": data.get("is_valid", False),
+                    "reason": data.get("reason", "Unknown"),
+                }, True
+            else:
+                print(
+                    f"Validation-API returned status {response.status_code}: {response.text}"
+                )
+                return None, response.status_code < 500
 
         except httpx.TimeoutException:
             print(f"Validation-API timeout after {self.timeout}s")
-            return None
+            return None, False
         except httpx.RequestError as e:
             print(f"Validation-API request error: {e}")
-            return None
+            return None, False
         except Exception as e:
             print(f"Unexpected error calling Validation-API: {e}")
-            return None
+            return None, False
 
 
 validation_client = StudentValidationClient()
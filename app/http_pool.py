@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.circuit_breaker import CircuitBreaker
+from app.config import env_bool
+from app.metrics import REGISTRY
+from app.retry import ResilientCaller, retry_budget
+
+# Latência das chamadas às APIs externas, por serviço e resultado
+outbound_request_duration = REGISTRY.histogram(
+    "unibus_outbound_request_duration_seconds",
+    "Duração das chamadas HTTP às APIs externas",
+    labelnames=("service", "outcome"),
+)
+
+
+def _outcome(response: Optional[httpx.Response], error: Optional[BaseException]) -> str:
+    if response is not None:
+        return f"{response.status_code // 100}xx"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    return "error"
+
+
+async def timed_request(service: str, request: Awaitable[httpx.Response]) -> httpx.Response:
+    """
+    Aguarda uma chamada externa registrando a duração no histograma.
+
+    O label 'outcome' é a classe do status (2xx, 4xx, 5xx), 'timeout',
+    'cancelled' ou 'error'.
+    """
+    started = time.perf_counter()
+    response = None
+    error = None
+    try:
+        response = await request
+        return response
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        outbound_request_duration.labels(service, _outcome(response, error)).observe(
+            time.perf_counter() - started
+        )
+
+
+def _http2_available() -> bool:
+    """HTTP/2 no httpx depende do pacote opcional 'h2' (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_pool_limits() -> httpx.Limits:
+    """
+    Monta os limites do pool de conexões a partir das variáveis de ambiente.
+
+    Variáveis:
+        HTTP_POOL_MAX_CONNECTIONS: máximo de conexões simultâneas por cliente
+        HTTP_POOL_MAX_KEEPALIVE: máximo de conexões ociosas mantidas abertas
+        HTTP_POOL_KEEPALIVE_EXPIRY: segundos até fechar uma conexão ociosa
+    """
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30.0")),
+    )
+
+
+def build_async_client(timeout: float, base_url: str = "") -> httpx.AsyncClient:
+    """
+    Cria um httpx.AsyncClient de longa duração com keep-alive e HTTP/2 opcional.
+
+    HTTP/2 é habilitado com HTTP2_ENABLED=true, desde que o pacote 'h2'
+    esteja instalado; caso contrário o cliente segue em HTTP/1.1.
+    """
+    http2 = env_bool("HTTP2_ENABLED")
+    if http2 and not _http2_available():
+        print("HTTP2_ENABLED=true mas o pacote 'h2' não está instalado - usando HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=timeout,
+        limits=build_pool_limits(),
+        http2=http2,
+    )
+
+
+def pool_stats(client: Optional[httpx.AsyncClient]) -> Dict[str, Any]:
+    """
+    Retorna estatísticas do pool de conexões de um AsyncClient.
+
+    Returns:
+        Dict com 'open', 'in_use', 'idle', 'waiting' e 'max_connections'
+    """
+    stats: Dict[str, Any] = {
+        "open": False,
+        "in_use": 0,
+        "idle": 0,
+        "waiting": 0,
+        "max_connections": None,
+    }
+    if client is None or client.is_closed:
+        return stats
+
+    stats["open"] = True
+    # httpx não expõe o pool publicamente; o transporte padrão guarda um
+    # httpcore.AsyncConnectionPool em '_pool'
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    if pool is None:
+        return stats
+
+    stats["max_connections"] = getattr(pool, "_max_connections", None)
+    for connection in pool.connections:
+        if connection.is_closed():
+            continue
+        if connection.is_idle():
+            stats["idle"] += 1
+        else:
+            stats["in_use"] += 1
+    stats["waiting"] = sum(
+        1 for request in getattr(pool, "_requests", []) if request.is_queued()
+    )
+    return stats
+
+
+class ServiceClient:
+    """
+    Base dos clientes das APIs externas.
+
+    Mantém o AsyncClient compartilhado (pool com keep-alive) e protege cada
+    chamada com o circuit breaker e com hedging e retries (ResilientCaller).
+    """
+
+    def __init__(self, service: str, timeout: float, base_url: str = ""):
+        self.service = service
+        self.timeout = timeout
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(service)
+        self.resilience = ResilientCaller(service, retry_budget)
+
+    async def start(self) -> None:
+        """Abre o AsyncClient compartilhado (chamado no lifespan da aplicação)"""
+        if self._client is None or self._client.is_closed:
+            self._client = build_async_client(self.timeout)
+
+    async def close(self) -> None:
+        """Fecha o AsyncClient compartilhado e suas conexões keep-alive"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Fora do lifespan (scripts, testes manuais) o cliente é aberto sob demanda
+        if self._client is None or self._client.is_closed:
+            self._client = build_async_client(self.timeout)
+        return self._client
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool de conexões do cliente"""
+        return pool_stats(self._client)
+
+    async def _protected_call(
+        self, attempt: Callable[[], Awaitable[Tuple[Any, bool]]]
+    ) -> Optional[Tuple[Any, bool]]:
+        """
+        Executa attempt() com hedging e retries, registrando o resultado no
+        circuit breaker.
+
+        attempt devolve (resultado, saudável); só respostas saudáveis
+        encerram os retries e contam como sucesso no breaker. O prazo total
+        é o timeout de uma tentativa; esgotado, vale como (None, False).
+
+        Returns:
+            O par (resultado, saudável), ou None se o circuito está aberto
+            (a chamada nem é feita)
+        """
+        if not self.breaker.allow():
+            return None
+
+        started = time.perf_counter()
+        healthy = None
+        try:
+            result = await self.resilience.call(
+                attempt,
+                lambda result: result[1],
+                timeout=self.timeout,
+                timeout_result=(None, False),
+            )
+            healthy = result[1]
+            return result
+        finally:
+            self.breaker.record(time.perf_counter() - started, healthy)
@@ -1,16 +1,49 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
-from app.db import engine, Base
+from app.audit_log import audit_log
+from app.cep_cache import cep_cache
+from app.cep_local import local_cep_resolver
+from app.config import env_bool
+from app.db import async_engine, pool_stats
+from app.external import validation_client
+from app.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from app.migrations import run_migrations
+from app.profiler import ProfilerMiddleware
+from app.request_metrics import MetricsMiddleware
+from app.response_cache import response_cache
+from app.retry import retry_budget
+from app.route_distance import route_distance_engine
 from app.routers import students, routes, trips
+from app.server_timing import ServerTimingMiddleware
+from app.services import cep_flight, eligibility_flight
+from app.viacep import viacep_client
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Startup: aplica as migrações pendentes (Alembic) fora do event loop
+    if env_bool("DB_AUTO_MIGRATE", True):
+        await asyncio.to_thread(run_migrations)
+    # Mapeia a base local de CEP, se importada (python -m app.cep_local import)
+    await asyncio.to_thread(local_cep_resolver.load)
+    # Carrega as coordenadas dos municípios usadas na estimativa das rotas
+    await asyncio.to_thread(route_distance_engine.gazetteer.load)
+    # Abre os clientes HTTP compartilhados (pool com keep-alive)
+    await viacep_client.start()
+    await validation_client.start()
+    # Inicia o gravador do log de validações em background
+    await audit_log.start()
     yield
+    # Shutdown: fecha as conexões mantidas pelos pools
+    await viacep_client.close()
+    await validation_client.close()
+    # Grava os registros pendentes do log antes de encerrar
+    await audit_log.stop()
+    local_cep_resolver.close()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -27,8 +60,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Headers customizados que os frontends precisam ler
+    expose_headers=[
+        "X-Next-Cursor",
+        "X-Validation-Mode",
+        "X-Validation-Time-Ms",
+        "Server-Timing",
+        "X-Profile-File",
+        "ETag",
+        "X-Cache",
+    ],
 )
 
+# Profiler por amostragem (opt-in) e detalhamento das fases no header Server-Timing
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+# Latência por rota, status e tempo de banco (adicionado por último: envolve todos)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(students.router)
 app.include_router(routes.router)
@@ -40,6 +89,79 @@ def health_check():
     return {"status": "ok", "message": "UniBus Core service is running."}
 
 
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+def metrics():
+    """Métricas no formato texto do Prometheus"""
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/health", tags=["health"])
 def health():
     return {"status": "healthy", "service": "unibus-core-api"}
+
+
+@app.get("/health/http-pools", tags=["health"])
+def http_pools():
+    """Estatísticas dos pools de conexões HTTP para as APIs externas"""
+    return {
+        "viacep": viacep_client.pool_stats(),
+        "validation_api": validation_client.pool_stats(),
+    }
+
+
+@app.get("/health/db-pool", tags=["health"])
+def db_pool():
+    """Conexões do pool do PostgreSQL e histograma de espera no checkout"""
+    return pool_stats()
+
+
+@app.get("/health/cep-cache", tags=["health"])
+def cep_cache_stats():
+    """Acertos, falhas e despejos do cache de CEP"""
+    return cep_cache.stats()
+
+
+@app.get("/health/response-cache", tags=["health"])
+def response_cache_stats():
+    """Acertos, 304 e invalidações do cache de respostas de rotas e viagens"""
+    return response_cache.stats()
+
+
+@app.get("/health/cep-local", tags=["health"])
+def cep_local_stats():
+    """Faixas carregadas e consultas resolvidas pela base local de CEP"""
+    return local_cep_resolver.stats()
+
+
+@app.get("/health/single-flight", tags=["health"])
+def single_flight_stats():
+    """Chamadas externas executadas e compartilhadas entre requisições simultâneas"""
+    return {
+        "cep": cep_flight.stats(),
+        "eligibility": eligibility_flight.stats(),
+    }
+
+
+@app.get("/health/audit-log", tags=["health"])
+def audit_log_stats():
+    """Fila, lotes gravados e descartes do log de validações"""
+    return audit_log.stats()
+
+
+@app.get("/health/circuit-breakers", tags=["health"])
+def circuit_breakers():
+    """Estado dos circuit breakers das APIs externas"""
+    return {
+        "viacep": viacep_client.breaker.stats(),
+        "validation_api": validation_client.breaker.stats(),
+    }
+
+
+@app.get("/health/retries", tags=["health"])
+def retries():
+    """Latência recente, retries, hedges e orçamento global de tentativas extras"""
+    return {
+        "viacep": viacep_client.resilience.stats(),
+        "validation_api": validation_client.resilience.stats(),
+        "budget": retry_budget.stats(),
+    }
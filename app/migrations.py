@@ -0,0 +1,45 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from app.db import engine
+
+# Raiz do projeto, onde ficam alembic.ini e migrations/
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chave do advisory lock que serializa as migrações entre workers
+MIGRATION_LOCK_KEY = 20251017
+
+# Última revisão equivalente ao esquema criado pelo antigo create_all
+LEGACY_BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    # Não reconfigura o logging da aplicação ao rodar dentro do lifespan
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def run_migrations() -> None:
+    """
+    Aplica todas as migrações pendentes (alembic upgrade head).
+
+    Bancos criados antes das migrações (via create_all) não têm a tabela
+    alembic_version: eles são marcados na revisão inicial antes do upgrade,
+    e as migrações seguintes só criam o que ainda não existe.
+    """
+    config = alembic_config()
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # Vários workers sobem juntos: só um aplica as migrações por vez
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "students" in tables:
+            print("Banco sem controle de versão: marcando revisão inicial")
+            command.stamp(config, LEGACY_BASELINE_REVISION)
+        command.upgrade(config, "head")
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from app.db import Base
+from app.normalize import normalize_city
 
 
 class Student(Base):
@@ -12,9 +13,27 @@ class Student(Base):
     email = Column(String, unique=True, nullable=False, index=True)
     cep = Column(String, nullable=False)
     city = Column(String, nullable=False)
-    city_ibge_code = Column(String, nullable=False)
+    # Cidade sem acentos e em minúsculas, usada nos filtros de GET /students
+    city_normalized = Column(String, nullable=True)
+    city_ibge_code = Column(String, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Chave da paginação por keyset de GET /students
+        Index("ix_students_created_at_id", "created_at", "id"),
+        # text_pattern_ops permite usar o índice em buscas por prefixo (LIKE 'x%')
+        Index(
+            "ix_students_city_normalized",
+            "city_normalized",
+            postgresql_ops={"city_normalized": "text_pattern_ops"},
+        ),
+    )
+
+    @validates("city")
+    def _sync_city_normalized(self, key, value):
+        self.city_normalized = normalize_city(value) if value is not None else None
+        return value
+
 
 class Route(Base):
     __tablename__ = "routes"
@@ -25,10 +44,28 @@ class Route(Base):
     destination_city = Column(String, nullable=False)
     distance_km = Column(Float, nullable=True) 
     estimated_duration_min = Column(Integer, nullable=True) 
+    # Cidades sem acentos e em minúsculas, usadas na busca de viagens
+    origin_city_normalized = Column(String, nullable=True)
+    destination_city_normalized = Column(String, nullable=True)
 
     # Relationship to trips
     trips = relationship("Trip", back_populates="route", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Rotas de uma origem (e destino) na busca GET /trips/search
+        Index(
+            "ix_routes_origin_destination",
+            "origin_city_normalized",
+            "destination_city_normalized",
+        ),
+    )
+
+    @validates("origin_city", "destination_city")
+    def _sync_cities_normalized(self, key, value):
+        normalized = normalize_city(value) if value is not None else None
+        setattr(self, f"{key}_normalized", normalized)
+        return value
+
 
 class Trip(Base):
     __tablename__ = "trips"
@@ -42,3 +79,23 @@ class Trip(Base):
 
     # Relationship to route
     route = relationship("Route", back_populates="trips")
+
+    __table_args__ = (
+        # Viagens de uma rota (FK, cascade delete) ordenadas por partida
+        Index("ix_trips_route_id_departure_time", "route_id", "departure_time"),
+        Index("ix_trips_departure_time", "departure_time"),
+    )
+
+
+class CepCache(Base):
+    """Camada persistente do cache de CEP, compartilhada entre os workers"""
+
+    __tablename__ = "cep_cache"
+
+    cep = Column(String(8), primary_key=True)
+    is_valid = Column(Boolean, nullable=False)
+    city = Column(String, nullable=True)
+    city_ibge_code = Column(String, nullable=True)
+    state = Column(String, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
@@ -0,0 +1,32 @@
+import unicodedata
+from datetime import datetime, timezone
+
+
+def normalize_city(city: str) -> str:
+    """
+    Normaliza o nome de uma cidade para busca: sem acentos, em minúsculas
+    e com espaços simples ('São  Paulo' -> 'sao paulo').
+    """
+    decomposed = unicodedata.normalize("NFKD", city)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def escape_like(value: str, escape: str = "\\") -> str:
+    """Escapa os curingas de LIKE (% e _) para busca literal"""
+    return (
+        value.replace(escape, escape * 2)
+        .replace("%", f"{escape}%")
+        .replace("_", f"{escape}_")
+    )
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    Converte um datetime com fuso para UTC sem tzinfo, o formato das colunas
+    TIMESTAMP (o asyncpg recusa valores com fuso nelas). Valores sem fuso
+    já são UTC e ficam como estão.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Mapping, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+
+from app.normalize import to_naive_utc
+
+# Header com o cursor opaco da próxima página (paginação por keyset)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codifica os valores da chave de ordenação em um cursor opaco"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """
+    Decodifica um cursor gerado por encode_cursor.
+
+    Args:
+        types: tipo de cada valor da chave (datetime ou int, por exemplo)
+
+    Raises:
+        HTTPException 400 se o cursor for inválido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("tamanho inesperado")
+        return [
+            to_naive_utc(datetime.fromisoformat(value)) if kind is datetime else kind(value)
+            for kind, value in zip(types, values)
+        ]
+    except (TypeError, ValueError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido",
+        )
+
+
+def set_next_cursor(
+    response: Response, items: Sequence[Any], limit: int, *key_attrs: str
+) -> Optional[str]:
+    """
+    Publica no header o cursor da próxima página quando a página veio cheia.
+
+    Args:
+        items: itens da página atual (objetos ou dicts), já ordenados pela chave
+        key_attrs: atributos que formam a chave de ordenação (ex.: 'id')
+    """
+    if limit <= 0 or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, Mapping):
+        values = [last[attr] for attr in key_attrs]
+    else:
+        values = [getattr(last, attr) for attr in key_attrs]
+    cursor = encode_cursor(values)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import env_bool
+
+# Fração das requisições perfiladas (0 desliga; 0.01 = 1%)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Permite pedir o profile de uma requisição com o header X-Profile: 1
+PROFILE_ALLOW_HEADER = env_bool("PROFILE_ALLOW_HEADER")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_FILE_HEADER = b"x-profile-file"
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+def _await_chain(task: asyncio.Task) -> Tuple[List, Any]:
+    """
+    Frames das corrotinas que a task está aguardando, da mais externa para a
+    mais interna, e o objeto aguardado no fim da cadeia (Future, Task...).
+    """
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames, awaitable
+
+
+class ProfileSession:
+    """Amostras de pilha de uma requisição"""
+
+    def __init__(self, task: asyncio.Task, thread_id: int, filename: str):
+        self.task = task
+        self.thread_id = thread_id
+        self.filename = filename
+        self.samples: Counter = Counter()
+
+    def sample(self, thread_frame) -> None:
+        frames, awaited = _await_chain(self.task)
+        if not frames:
+            return
+        stack = [_frame_label(f) for f in frames]
+        # Se a task está executando agora, completa com o código síncrono
+        # que ela chamou (o frame mais interno está na pilha da thread)
+        innermost = frames[-1]
+        sync_frames = []
+        frame = thread_frame
+        while frame is not None and frame is not innermost:
+            sync_frames.append(frame)
+            frame = frame.f_back
+        if frame is innermost:
+            stack.extend(_frame_label(f) for f in reversed(sync_frames))
+        else:
+            stack.append(f"(aguardando {type(awaited).__name__ if awaited is not None else 'I/O'})")
+        self.samples[";".join(stack)] += 1
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem para requisições selecionadas.
+
+    Uma thread daemon acorda a cada PROFILE_INTERVAL_MS enquanto houver
+    requisições perfiladas e registra a cadeia de awaits de cada uma (e o
+    código síncrono em execução, quando é a vez dela no event loop). Assim o
+    tempo esperando a ViaCEP ou o banco aparece no flamegraph, não só o uso
+    de CPU. As pilhas são gravadas no formato 'folded' (uma pilha por linha,
+    frames separados por ';' e o número de amostras no final), aceito por
+    flamegraph.pl, speedscope e inferno.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, directory: str = PROFILE_DIR):
+        self.interval = interval
+        self.directory = directory
+        self._sessions: Dict[int, ProfileSession] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def should_profile(self, headers) -> bool:
+        if PROFILE_ALLOW_HEADER:
+            for name, value in headers:
+                if name == PROFILE_HEADER and value in (b"1", b"true"):
+                    return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    def start(self, method: str, path: str) -> ProfileSession:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        # Só ASCII seguro: o nome vai para o disco e para o header X-Profile-File
+        slug = _UNSAFE_FILENAME_CHARS.sub("_", path.strip("/"))[:80] or "root"
+        filename = f"{stamp}-{method}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+        session = ProfileSession(asyncio.current_task(), threading.get_ident(), filename)
+        with self._lock:
+            self._sessions[id(session)] = session
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+        return session
+
+    async def stop(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.pop(id(session), None)
+        # Grava fora do event loop
+        await asyncio.to_thread(self._write, session)
+
+    def _write(self, session: ProfileSession) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, session.filename)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in session.samples.items():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Erro ao gravar profile {session.filename}: {e}")
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                sessions = list(self._sessions.values())
+            if not sessions:
+                # Dorme até a próxima requisição perfilada
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            for session in sessions:
+                try:
+                    session.sample(frames.get(session.thread_id))
+                except Exception:
+                    # A pilha mudou durante a leitura; descarta a amostra
+                    continue
+            time.sleep(self.interval)
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila as requisições selecionadas.
+
+    Uma requisição é perfilada pela amostragem (PROFILE_SAMPLE_RATE) ou pelo
+    header X-Profile: 1 (com PROFILE_ALLOW_HEADER=true). O nome do arquivo
+    gravado em PROFILE_DIR volta no header X-Profile-File.
+    """
+
+    def __init__(self, app, profiler: Optional[SamplingProfiler] = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_profile(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_FILE_HEADER, session.filename.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await self.profiler.stop(session)
+
+
+# Singleton instance
+request_profiler = SamplingProfiler()
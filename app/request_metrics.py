@@ -0,0 +1,67 @@
+import time
+
+from app.db import QueryStats, current_query_stats
+from app.metrics import REGISTRY
+
+# Limites para a quantidade de comandos SQL por requisição
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+http_request_duration = REGISTRY.histogram(
+    "unibus_http_request_duration_seconds",
+    "Duração das requisições HTTP por rota (template) e status",
+    labelnames=("method", "route", "status"),
+)
+http_request_db_duration = REGISTRY.histogram(
+    "unibus_http_request_db_seconds",
+    "Tempo gasto no banco de dados por requisição",
+    labelnames=("method", "route"),
+)
+http_request_db_queries = REGISTRY.histogram(
+    "unibus_http_request_db_queries",
+    "Comandos SQL executados por requisição",
+    labelnames=("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP.
+
+    O label 'route' é o template da rota (/trips/{trip_id}), não o caminho
+    real, para manter a cardinalidade baixa; caminhos que não casam com
+    nenhuma rota viram '<unmatched>'. O custo por requisição é um
+    perf_counter, um lookup de dicionário e três observações.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_query_stats.reset(token)
+            # O router do FastAPI grava a rota encontrada no próprio scope
+            route = scope.get("route")
+            template = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            http_request_duration.labels(method, template, str(status_code)).observe(elapsed)
+            http_request_db_duration.labels(method, template).observe(query_stats.seconds)
+            http_request_db_queries.labels(method, template).observe(query_stats.count)
@@ -0,0 +1,194 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.cep_cache import TTLLRUCache
+from app.config import env_bool
+from app.metrics import REGISTRY
+from app.server_timing import TimedRoute
+from app.singleflight import SingleFlight
+
+RESPONSE_CACHE_ENABLED = env_bool("RESPONSE_CACHE_ENABLED", True)
+
+# Headers da resposta original que não são guardados no cache
+_SKIPPED_HEADERS = {"content-length", "etag", "last-modified", "cache-control", "server-timing"}
+
+
+class CachedResponse:
+    """Corpo serializado de uma resposta 200 e os seus validadores"""
+
+    __slots__ = ("version", "body", "headers", "etag")
+
+    def __init__(self, version: int, body: bytes, headers: Dict[str, str]):
+        self.version = version
+        self.body = body
+        self.headers = headers
+        # Hash do conteúdo: workers diferentes geram o mesmo ETag para os mesmos dados
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+class ResponseCache:
+    """
+    Cache em memória das respostas GET de rotas e viagens, com versões.
+
+    Cada namespace ('routes', 'trips') tem um número de versão que os
+    handlers de escrita incrementam com invalidate() após o commit. Uma
+    entrada só vale para a versão em que foi gerada, então uma escrita
+    invalida de uma vez todas as páginas e detalhes do namespace. Polls sem
+    mudança saem da memória sem abrir sessão no banco. Com If-None-Match
+    compatível a resposta é 304, sem corpo.
+
+    Não há Last-Modified: o horário da última escrita só é conhecido pelo
+    worker que a recebeu, e um If-Modified-Since comparado com ele poderia
+    confirmar como atuais os dados antigos de outro worker. O ETag é o hash
+    do corpo, então vale igual em qualquer worker.
+
+    O cache é por processo: com vários workers, uma escrita só invalida o
+    worker que a recebeu. RESPONSE_CACHE_TTL limita por quanto tempo os
+    outros workers podem servir a versão anterior.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+        self.entries = TTLLRUCache(int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")))
+        self._versions: Dict[str, int] = {}
+        # Misses simultâneos da mesma página fazem uma única consulta
+        self._flight = SingleFlight("response_cache")
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Descarta as respostas dos namespaces (chamar depois do commit)"""
+        for namespace in namespaces:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        self.invalidations += 1
+
+    def _lookup(self, key: Tuple, version: int) -> Optional[CachedResponse]:
+        found, entry = self.entries.get(key)
+        if found and entry.version == version:
+            return entry
+        return None
+
+    async def _fill(self, key: Tuple, version: int, request: Request, handler):
+        response = await handler(request)
+        body = getattr(response, "body", None)
+        if response.status_code != 200 or body is None:
+            return response
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in _SKIPPED_HEADERS
+        }
+        entry = CachedResponse(version, bytes(body), headers)
+        # Se houve escrita durante a consulta a versão já mudou e a entrada
+        # nasce inválida: nunca serve dados anteriores ao commit
+        self.entries.set(key, entry, self.ttl)
+        return entry
+
+    async def serve(self, request: Request, namespace: str, handler) -> Response:
+        """Responde do cache ou chama o handler da rota e guarda a resposta"""
+        version = self._versions.get(namespace, 0)
+        key = (namespace, request.url.path, request.url.query)
+        entry = self._lookup(key, version)
+        if entry is not None:
+            self.hits += 1
+            cache_status = "HIT"
+        else:
+            self.misses += 1
+            cache_status = "MISS"
+            result = await self._flight.do(
+                (key, version), lambda: self._fill(key, version, request, handler)
+            )
+            if not isinstance(result, CachedResponse):
+                # Respostas que não são 200 seguem sem cache
+                return result
+            entry = result
+
+        validators = {
+            "etag": entry.etag,
+            # Os clientes podem guardar a resposta, mas revalidam a cada uso
+            "cache-control": "no-cache",
+            "x-cache": cache_status,
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and _etag_matches(entry.etag, if_none_match):
+            self.not_modified += 1
+            return Response(status_code=304, headers=validators)
+        return Response(content=entry.body, status_code=200, headers={**entry.headers, **validators})
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": len(self.entries),
+            "max_entries": self.entries.max_entries,
+            "versions": dict(self._versions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "evictions": self.entries.evictions,
+            "expirations": self.entries.expirations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+# Singleton instance
+response_cache = ResponseCache()
+
+
+def cached(namespace: str):
+    """
+    Marca um endpoint GET para ser servido pelo response_cache.
+
+    Use abaixo do decorator da rota, num router com route_class=CachedRoute.
+    """
+    def decorator(endpoint):
+        endpoint._cache_namespace = namespace
+        return endpoint
+    return decorator
+
+
+class CachedRoute(TimedRoute):
+    """TimedRoute que serve do response_cache os endpoints marcados com @cached"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        self.cache_namespace = getattr(endpoint, "_cache_namespace", None)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if self.cache_namespace is None or not RESPONSE_CACHE_ENABLED:
+            return handler
+        namespace = self.cache_namespace
+
+        async def cached_handler(request: Request) -> Response:
+            return await response_cache.serve(request, namespace, handler)
+
+        return cached_handler
+
+
+REGISTRY.callback(
+    "unibus_response_cache_requests_total",
+    "Requisições servidas pelo cache de respostas, por resultado",
+    lambda: [
+        (("hit",), response_cache.hits),
+        (("miss",), response_cache.misses),
+        (("not_modified",), response_cache.not_modified),
+    ],
+    labelnames=("result",),
+    kind="counter",
+)
@@ -0,0 +1,288 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.config import env_bool
+from app.metrics import REGISTRY
+
+T = TypeVar("T")
+
+# Resultado interno de uma tentativa interrompida pelo prazo total da chamada
+_EXPIRED = object()
+
+
+class LatencyTracker:
+    """Latências recentes das respostas bem-sucedidas, para estimar percentis"""
+
+    def __init__(self, size: int = 500, min_samples: int = 20):
+        self._samples: deque = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentil (0 a 1) das amostras, ou None enquanto houver poucas"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(pct * len(samples)), len(samples) - 1)]
+
+
+class RetryBudget:
+    """
+    Orçamento global de tentativas extras (retries e hedges).
+
+    Cada chamada original deposita RETRY_BUDGET_RATIO fichas e cada
+    tentativa extra gasta uma, além de um mínimo de
+    RETRY_BUDGET_MIN_PER_SECOND por segundo para serviços com pouco tráfego.
+    Com 0.1, as tentativas extras ficam limitadas a ~10% do tráfego: durante
+    uma queda os retries não multiplicam a carga sobre o serviço.
+    """
+
+    def __init__(
+        self,
+        ratio: Optional[float] = None,
+        min_per_second: Optional[float] = None,
+        max_tokens: float = 10.0,
+    ):
+        self.ratio = ratio if ratio is not None else float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+        self.min_per_second = (
+            min_per_second
+            if min_per_second is not None
+            else float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1.0"))
+        )
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.deposits = 0
+        self.spent = 0
+        self.denied = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._refilled_at) * self.min_per_second)
+        self._refilled_at = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+            self.deposits += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.spent += 1
+                return True
+            self.denied += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {
+                "tokens": round(self._tokens, 2),
+                "deposits": self.deposits,
+                "spent": self.spent,
+                "denied": self.denied,
+            }
+
+
+class ResilientCaller:
+    """
+    Tentativas com hedging e retries para um cliente externo.
+
+    Hedging: se a primeira tentativa não responde dentro do p95 recente
+    (HEDGE_PERCENTILE), dispara uma segunda e fica com a primeira resposta
+    boa. Retries: respostas ruins (timeout, erro de rede, 5xx) são repetidas
+    até RETRY_MAX_ATTEMPTS, com backoff exponencial e jitter completo.
+    Hedges e retries só acontecem se o orçamento global permitir e cabem
+    no prazo total da chamada.
+    """
+
+    def __init__(self, name: str, budget: "RetryBudget"):
+        self.name = name
+        self.budget = budget
+        self.latency = LatencyTracker()
+        self.max_attempts = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))
+        self.backoff_base = float(os.getenv("RETRY_BACKOFF_BASE", "0.1"))
+        self.backoff_max = float(os.getenv("RETRY_BACKOFF_MAX", "1.0"))
+        self.hedge_enabled = env_bool("HEDGE_ENABLED", True)
+        self.hedge_percentile = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+        self.hedge_min_delay = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+        # Atraso do hedge enquanto não há amostras suficientes para o p95
+        self.hedge_default_delay = float(os.getenv("HEDGE_DEFAULT_DELAY", "1.0"))
+
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        _callers.append(self)
+
+    def hedge_delay(self) -> float:
+        estimate = self.latency.percentile(self.hedge_percentile)
+        if estimate is None:
+            return self.hedge_default_delay
+        return max(estimate, self.hedge_min_delay)
+
+    def backoff(self, retry: int) -> float:
+        """Jitter completo: sorteio entre 0 e base * 2^retry (limitado a backoff_max)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** retry)))
+
+    async def call(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        is_good: Callable[[T], bool],
+        timeout: Optional[float] = None,
+        timeout_result: Optional[T] = None,
+    ) -> T:
+        """
+        Executa attempt() com hedging e retries, dentro de um prazo total.
+
+        Args:
+            attempt: faz uma tentativa e devolve o resultado (sem lançar
+                exceções para falhas esperadas)
+            is_good: diz se o resultado é uma resposta válida; resultados
+                ruins podem ser repetidos
+            timeout: prazo total da chamada, somando tentativas, hedges e
+                backoff (use o timeout de uma tentativa: hedges e retries
+                nunca fazem a chamada demorar mais que uma tentativa sem
+                eles). None = sem prazo
+            timeout_result: devolvido quando o prazo acaba sem resposta; as
+                tentativas pendentes são canceladas
+        """
+        self.calls += 1
+        self.budget.deposit()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        result = await self._hedged(attempt, is_good, deadline)
+        for retry in range(self.max_attempts - 1):
+            if result is _EXPIRED or is_good(result):
+                break
+            delay = self.backoff(retry)
+            # Uma tentativa que esgotou o prazo não é repetida: só falhas
+            # rápidas (5xx, conexão recusada) deixam tempo para outra
+            if deadline is not None and deadline - loop.time() <= delay:
+                break
+            if not self.budget.try_spend():
+                break
+            self.retries += 1
+            await asyncio.sleep(delay)
+            result = await self._hedged(attempt, is_good, deadline)
+
+        if result is _EXPIRED:
+            self.deadline_exceeded += 1
+            return timeout_result
+        return result
+
+    async def _timed(self, attempt: Callable[[], Awaitable[T]], is_good: Callable[[T], bool]) -> T:
+        started = time.perf_counter()
+        result = await attempt()
+        if is_good(result):
+            self.latency.observe(time.perf_counter() - started)
+        return result
+
+    async def _hedged(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        is_good: Callable[[T], bool],
+        deadline: Optional[float],
+    ) -> Any:
+        """Uma tentativa (mais o hedge); _EXPIRED se o prazo acabar antes"""
+        loop = asyncio.get_running_loop()
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(deadline - loop.time(), 0.0)
+
+        primary = asyncio.ensure_future(self._timed(attempt, is_good))
+        tasks: List[asyncio.Future] = [primary]
+        try:
+            if self.hedge_enabled:
+                left = remaining()
+                hedge_delay = self.hedge_delay() if left is None else min(self.hedge_delay(), left)
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done and remaining() != 0.0 and self.budget.try_spend():
+                    self.hedges += 1
+                    tasks.append(asyncio.ensure_future(self._timed(attempt, is_good)))
+
+            # Fica com a primeira resposta boa; se todas forem ruins, com a última
+            pending = set(tasks)
+            result: Any = _EXPIRED
+            while pending:
+                left = remaining()
+                if left == 0.0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=left, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result = task.result()
+                    if is_good(result):
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return result
+            return result
+        finally:
+            # Prazo esgotado ou resposta boa: cancela o que ainda está pendente
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        p50 = self.latency.percentile(0.5)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1) if self.hedge_enabled else None,
+        }
+
+
+_callers: List[ResilientCaller] = []
+
+# Orçamento compartilhado por todos os clientes externos
+retry_budget = RetryBudget()
+
+
+def _collect_extra_attempts():
+    for caller in _callers:
+        yield (caller.name, "retry"), caller.retries
+        yield (caller.name, "hedge"), caller.hedges
+
+
+REGISTRY.callback(
+    "unibus_outbound_extra_attempts_total",
+    "Tentativas extras (retries e hedges) às APIs externas",
+    _collect_extra_attempts,
+    labelnames=("service", "kind"),
+    kind="counter",
+)
+REGISTRY.callback(
+    "unibus_retry_budget_denied_total",
+    "Retries e hedges recusados por falta de orçamento",
+    lambda: [((), retry_budget.denied)],
+    kind="counter",
+)
+REGISTRY.callback(
+    "unibus_retry_budget_tokens",
+    "Fichas disponíveis no orçamento global de retries",
+    lambda: [((), retry_budget.stats()["tokens"])],
+)
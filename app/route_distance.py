@@ -0,0 +1,292 @@
+"""
+Estimativa offline de distância e duração das rotas.
+
+As cidades de origem e destino são resolvidas para coordenadas pelo
+gazetteer GAZETTEER_FILE (CSV com ibge_code,city,state,latitude,longitude;
+o arquivo incluído em data/ traz as capitais e os principais municípios e
+pode ser trocado pela lista completa do IBGE com as mesmas colunas).
+
+A distância é a do grande círculo (haversine, vetorizada com NumPy)
+multiplicada por um fator de desvio rodoviário, maior em trechos curtos.
+A duração usa uma velocidade média que sobe de ROUTE_URBAN_SPEED_KMH
+(trechos urbanos) até ROUTE_HIGHWAY_SPEED_KMH (rodovia), mais
+ROUTE_STOP_MINUTES de embarque e desembarque.
+
+Uso:
+    python -m app.route_distance estimate "Rio de Janeiro" "Niterói"
+    python -m app.route_distance recompute
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models import Route
+from app.normalize import normalize_city
+
+# Padrão relativo à raiz do projeto (e não ao diretório de trabalho)
+GAZETTEER_FILE = os.getenv(
+    "GAZETTEER_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "municipios.csv"),
+)
+
+# Desvio da estrada em relação à linha reta: fator base e acréscimo que
+# decai com a distância (trechos curtos contornam mais)
+ROUTE_ROAD_FACTOR = float(os.getenv("ROUTE_ROAD_FACTOR", "1.25"))
+ROUTE_SHORT_TRIP_FACTOR = float(os.getenv("ROUTE_SHORT_TRIP_FACTOR", "0.35"))
+ROUTE_URBAN_SPEED_KMH = float(os.getenv("ROUTE_URBAN_SPEED_KMH", "30"))
+ROUTE_HIGHWAY_SPEED_KMH = float(os.getenv("ROUTE_HIGHWAY_SPEED_KMH", "70"))
+ROUTE_STOP_MINUTES = float(os.getenv("ROUTE_STOP_MINUTES", "10"))
+# Rotas lidas e atualizadas por vez no recálculo em lote
+ROUTE_RECOMPUTE_BATCH_SIZE = int(os.getenv("ROUTE_RECOMPUTE_BATCH_SIZE", "5000"))
+
+EARTH_RADIUS_KM = 6371.0088
+# Distâncias (km) em que o desvio extra e a lentidão urbana caem a ~37%
+SHORT_TRIP_DECAY_KM = 50.0
+URBAN_SPEED_DECAY_KM = 60.0
+
+# 'Cidade - UF', 'Cidade/UF', 'Cidade, UF' ou 'Cidade (UF)'
+_STATE_SUFFIX = re.compile(r"^(.*?)\s*(?:[-/,]\s*|\()([A-Za-z]{2})\)?\s*$")
+
+
+class GazetteerUnavailable(Exception):
+    """O gazetteer não foi carregado (arquivo ausente ou inválido)"""
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distância do grande círculo (km) entre arrays de coordenadas em graus"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def road_distance_km(straight_km: np.ndarray) -> np.ndarray:
+    factor = ROUTE_ROAD_FACTOR + ROUTE_SHORT_TRIP_FACTOR * np.exp(-straight_km / SHORT_TRIP_DECAY_KM)
+    return straight_km * factor
+
+
+def duration_minutes(road_km: np.ndarray) -> np.ndarray:
+    speed = ROUTE_HIGHWAY_SPEED_KMH - (ROUTE_HIGHWAY_SPEED_KMH - ROUTE_URBAN_SPEED_KMH) * np.exp(
+        -road_km / URBAN_SPEED_DECAY_KM
+    )
+    return np.rint(ROUTE_STOP_MINUTES + road_km / speed * 60).astype(np.int64)
+
+
+class Gazetteer:
+    """Coordenadas dos municípios, indexadas pelo nome normalizado"""
+
+    def __init__(self, path: str = GAZETTEER_FILE):
+        self.path = path
+        self.latitudes = np.empty(0)
+        self.longitudes = np.empty(0)
+        self.states: List[str] = []
+        self._by_name: Dict[str, List[int]] = {}
+        self.loaded = False
+
+    def load(self) -> None:
+        latitudes, longitudes, states, by_name = [], [], [], {}
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    by_name.setdefault(normalize_city(row["city"]), []).append(len(states))
+                    states.append(row["state"].strip().upper())
+                    latitudes.append(float(row["latitude"]))
+                    longitudes.append(float(row["longitude"]))
+        except (OSError, KeyError, ValueError) as e:
+            print(
+                f"Gazetteer de municípios indisponível em {self.path}: {e} - "
+                "rotas novas ficam sem distância e duração estimadas"
+            )
+            latitudes, longitudes, states, by_name = [], [], [], {}
+        self.latitudes = np.array(latitudes, dtype=np.float64)
+        self.longitudes = np.array(longitudes, dtype=np.float64)
+        self.states = states
+        self._by_name = by_name
+        self.loaded = True
+
+    def resolve(self, city: str) -> Optional[int]:
+        """
+        Índice do município, ou None se não existe ou o nome é ambíguo.
+
+        Nomes repetidos em mais de um estado precisam da UF ('Cidade - UF').
+        """
+        if not self.loaded:
+            self.load()
+        candidates = self._by_name.get(normalize_city(city))
+        if candidates is None:
+            match = _STATE_SUFFIX.match(city)
+            if not match:
+                return None
+            name, state = match.groups()
+            candidates = [
+                i for i in self._by_name.get(normalize_city(name), [])
+                if self.states[i] == state.upper()
+            ]
+        return candidates[0] if len(candidates) == 1 else None
+
+    @property
+    def available(self) -> bool:
+        """Carregado com pelo menos um município"""
+        if not self.loaded:
+            self.load()
+        return len(self.states) > 0
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+
+class RouteDistanceEngine:
+    """Distância rodoviária estimada e duração das rotas, em lote"""
+
+    def __init__(self, gazetteer: Optional[Gazetteer] = None):
+        self.gazetteer = gazetteer or Gazetteer()
+
+    def estimate_many(
+        self, pairs: Sequence[Tuple[str, str]]
+    ) -> List[Optional[Tuple[float, int]]]:
+        """
+        Estima (distance_km, estimated_duration_min) para cada par
+        (origem, destino) numa única passada vetorizada.
+
+        Returns:
+            Uma estimativa por par, ou None quando alguma cidade não foi
+            encontrada ou origem e destino são a mesma cidade
+        """
+        origins = np.array([self._index(o) for o, _ in pairs], dtype=np.int64)
+        destinations = np.array([self._index(d) for _, d in pairs], dtype=np.int64)
+        valid = (origins >= 0) & (destinations >= 0) & (origins != destinations)
+
+        results: List[Optional[Tuple[float, int]]] = [None] * len(pairs)
+        if not valid.any():
+            return results
+
+        lat, lon = self.gazetteer.latitudes, self.gazetteer.longitudes
+        o, d = origins[valid], destinations[valid]
+        road_km = road_distance_km(haversine_km(lat[o], lon[o], lat[d], lon[d]))
+        minutes = duration_minutes(road_km)
+        for position, km, duration in zip(np.flatnonzero(valid), np.round(road_km, 1), minutes):
+            results[position] = (float(km), int(duration))
+        return results
+
+    def estimate(self, origin_city: str, destination_city: str) -> Optional[Tuple[float, int]]:
+        return self.estimate_many([(origin_city, destination_city)])[0]
+
+    def _index(self, city: str) -> int:
+        index = self.gazetteer.resolve(city)
+        return -1 if index is None else index
+
+    async def recompute_all(
+        self, db: AsyncSession, batch_size: int = ROUTE_RECOMPUTE_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Recalcula a distância e a duração de todas as rotas.
+
+        Lê as rotas em blocos por id (só as colunas necessárias), estima o
+        bloco inteiro de uma vez e grava apenas as rotas cujos valores
+        mudaram, com um UPDATE em lote por bloco (executemany). Rotas com
+        cidades não encontradas ficam como estão. O commit é do chamador.
+
+        Raises:
+            GazetteerUnavailable: sem gazetteer, todas as cidades viriam
+                como não encontradas
+        """
+        if not self.gazetteer.available:
+            raise GazetteerUnavailable(f"Gazetteer de municípios indisponível em {self.gazetteer.path}")
+        stats: Dict[str, Any] = {"routes": 0, "updated": 0, "unresolved": 0}
+        changed_ids: List[int] = []
+        unresolved_cities = set()
+        last_id = 0
+        while True:
+            rows = (
+                await db.execute(
+                    select(
+                        Route.id,
+                        Route.origin_city,
+                        Route.destination_city,
+                        Route.distance_km,
+                        Route.estimated_duration_min,
+                    )
+                    .where(Route.id > last_id)
+                    .order_by(Route.id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats["routes"] += len(rows)
+
+            estimates = self.estimate_many([(row.origin_city, row.destination_city) for row in rows])
+            changes = []
+            for row, estimate in zip(rows, estimates):
+                if estimate is None:
+                    stats["unresolved"] += 1
+                    for city in (row.origin_city, row.destination_city):
+                        if self.gazetteer.resolve(city) is None:
+                            unresolved_cities.add(city)
+                    continue
+                distance_km, duration_min = estimate
+                if (row.distance_km, row.estimated_duration_min) != (distance_km, duration_min):
+                    changes.append(
+                        {"id": row.id, "distance_km": distance_km, "estimated_duration_min": duration_min}
+                    )
+            if changes:
+                # UPDATE em lote pela chave primária (um executemany, sem carregar objetos)
+                await db.execute(update(Route), changes)
+                changed_ids.extend(change["id"] for change in changes)
+
+        stats["updated"] = len(changed_ids)
+        stats["changed_route_ids"] = changed_ids
+        stats["unresolved_cities"] = sorted(unresolved_cities)[:50]
+        return stats
+
+
+# Singleton instance
+route_distance_engine = RouteDistanceEngine()
+
+
+async def _recompute() -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        stats = await route_distance_engine.recompute_all(db)
+        await db.commit()
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Distância e duração das rotas")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    estimate_cmd = commands.add_parser("estimate", help="estima uma rota entre duas cidades")
+    estimate_cmd.add_argument("origin_city")
+    estimate_cmd.add_argument("destination_city")
+
+    commands.add_parser("recompute", help="recalcula todas as rotas do banco")
+
+    args = parser.parse_args(argv)
+    if args.command == "estimate":
+        estimate = route_distance_engine.estimate(args.origin_city, args.destination_city)
+        if estimate is None:
+            raise SystemExit("Cidade não encontrada no gazetteer (ou origem igual ao destino)")
+        print(f"{estimate[0]} km, {estimate[1]} min")
+    else:
+        try:
+            stats = asyncio.run(_recompute())
+        except GazetteerUnavailable as e:
+            raise SystemExit(str(e))
+        stats.pop("changed_route_ids")
+        print(stats)
+
+
+if __name__ == "__main__":
+    main()
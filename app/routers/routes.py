@@ -1,25 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
 
 from app.db import get_db
-from app.models import Route
-from app.schemas import RouteCreate, RouteUpdate, RouteResponse
+from app.export import ExportFormat, export_response
+from app.pagination import decode_cursor, set_next_cursor
+from app.serialization import json_response, rows_to_dicts, schema_columns
+from app.models import Route, Trip
+from app.response_cache import CachedRoute, cached, response_cache
+from app.arrival_times import count_stale_arrivals, recompute_arrival_times
+from app.route_distance import GazetteerUnavailable, route_distance_engine
+from app.schemas import (
+    RouteCreate,
+    RouteUpdate,
+    RouteResponse,
+    RouteRecomputeResponse,
+    ArrivalRecomputeResponse,
+    TripResponse,
+)
 
-router = APIRouter(prefix="/routes", tags=["routes"])
+router = APIRouter(prefix="/routes", tags=["routes"], route_class=CachedRoute)
 
 
 @router.get("/", response_model=List[RouteResponse])
-def get_routes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Coleta todas as rotas com paginação"""
-    routes = db.query(Route).offset(skip).limit(limit).all()
-    return routes
+@cached("routes")
+async def get_routes(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor); substitui skip"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Coleta todas as rotas com paginação.
+
+    Ordenadas por id; o header X-Next-Cursor traz o cursor da próxima página.
+    """
+    query = select(*schema_columns(Route, RouteResponse)).order_by(Route.id)
+    if cursor:
+        # Paginação por keyset: custo constante em qualquer profundidade
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.where(Route.id > last_id)
+    else:
+        query = query.offset(skip)
+
+    routes = rows_to_dicts(await db.execute(query.limit(limit)))
+    response = json_response(routes)
+    set_next_cursor(response, routes, limit, "id")
+    return response
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_routes(
+    export_format: ExportFormat = Query("ndjson", alias="format", description="ndjson ou csv"),
+):
+    """Exporta todas as rotas em streaming (NDJSON ou CSV), ordenadas por id"""
+    statement = select(
+        Route.id,
+        Route.name,
+        Route.origin_city,
+        Route.destination_city,
+        Route.distance_km,
+        Route.estimated_duration_min,
+    ).order_by(Route.id)
+    return export_response(statement, export_format, "routes")
 
 
 @router.get("/{route_id}", response_model=RouteResponse)
-def get_route(route_id: int, db: Session = Depends(get_db)):
+@cached("routes")
+async def get_route(route_id: int, db: AsyncSession = Depends(get_db)):
     """Coleta uma rota pelo ID"""
-    route = db.query(Route).filter(Route.id == route_id).first()
+    route = await db.get(Route, route_id)
     if not route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -28,57 +81,176 @@ def get_route(route_id: int, db: Session = Depends(get_db)):
     return route
 
 
+@router.get("/{route_id}/trips", response_model=List[TripResponse])
+@cached("trips")
+async def get_route_trips(
+    route_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Busca as viagens de uma rota, ordenadas por partida.
+
+    Sempre duas consultas (a rota e um SELECT das viagens pelo índice
+    route_id + departure_time), qualquer que seja o número de viagens.
+    """
+    if await db.scalar(select(Route.id).where(Route.id == route_id)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Rota com ID {route_id} não encontrada",
+        )
+
+    query = (
+        select(*schema_columns(Trip, TripResponse))
+        .where(Trip.route_id == route_id)
+        .order_by(Trip.departure_time, Trip.id)
+    )
+    if cursor:
+        last_departure, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(Trip.departure_time, Trip.id) > tuple_(last_departure, last_id)
+        )
+
+    trips = rows_to_dicts(await db.execute(query.limit(limit)))
+    response = json_response(trips)
+    set_next_cursor(response, trips, limit, "departure_time", "id")
+    return response
+
+
 @router.post("/", response_model=RouteResponse, status_code=status.HTTP_201_CREATED)
-def create_route(route: RouteCreate, db: Session = Depends(get_db)):
-    """Cria uma nova rota"""
+async def create_route(route: RouteCreate, db: AsyncSession = Depends(get_db)):
+    """Cria uma nova rota, com distância e duração estimadas pelo gazetteer"""
+    # Sem estimativa (cidade fora do gazetteer), os campos ficam nulos
+    distance_km, duration_min = (
+        route_distance_engine.estimate(route.origin_city, route.destination_city) or (None, None)
+    )
     db_route = Route(
         name=route.name,
         origin_city=route.origin_city,
         destination_city=route.destination_city,
-        distance_km=None,
-        estimated_duration_min=None,
+        distance_km=distance_km,
+        estimated_duration_min=duration_min,
     )
 
     db.add(db_route)
-    db.commit()
-    db.refresh(db_route)
+    await db.commit()
+    await db.refresh(db_route)
+    # As viagens também mudam: as respostas delas incluem a rota
+    response_cache.invalidate("routes", "trips")
 
     return db_route
 
 
+@router.post("/recompute-distances", response_model=RouteRecomputeResponse)
+async def recompute_route_distances(db: AsyncSession = Depends(get_db)):
+    """
+    Recalcula a distância e a duração de todas as rotas numa única passada.
+
+    As rotas são estimadas em blocos vetorizados e só as que mudaram são
+    gravadas. Cidades que o gazetteer não conhece voltam em unresolved_cities.
+    Sem gazetteer carregado retorna 503, sem alterar nenhuma rota.
+    """
+    try:
+        stats = await route_distance_engine.recompute_all(db)
+    except GazetteerUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    await db.commit()
+    # Viagens futuras das rotas com duração nova ganham a chegada recalculada
+    stats["trips_updated"] = await recompute_arrival_times(db, stats["changed_route_ids"])
+    if stats["updated"]:
+        response_cache.invalidate("routes", "trips")
+    return stats
+
+
+@router.post("/{route_id}/recompute-arrivals", response_model=ArrivalRecomputeResponse)
+async def recompute_route_arrivals(
+    route_id: int,
+    dry_run: bool = Query(False, description="Só conta as viagens que seriam alteradas"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Recalcula o arrival_time das viagens futuras da rota pela duração atual.
+
+    Um UPDATE por bloco de viagens (TRIP_ARRIVAL_CHUNK_SIZE), sem carregar
+    as viagens. Com dry_run=true retorna quantas viagens mudariam.
+    """
+    duration = (
+        await db.execute(select(Route.id, Route.estimated_duration_min).where(Route.id == route_id))
+    ).first()
+    if duration is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Rota com ID {route_id} não encontrada",
+        )
+
+    if dry_run:
+        trips = await count_stale_arrivals(db, [route_id])
+    else:
+        trips = await recompute_arrival_times(db, [route_id])
+        if trips:
+            response_cache.invalidate("trips")
+    return ArrivalRecomputeResponse(
+        route_id=route_id,
+        estimated_duration_min=duration.estimated_duration_min,
+        dry_run=dry_run,
+        trips=trips,
+    )
+
+
 @router.put("/{route_id}", response_model=RouteResponse)
-def update_route(
-    route_id: int, route: RouteUpdate, db: Session = Depends(get_db)
+async def update_route(
+    route_id: int, route: RouteUpdate, db: AsyncSession = Depends(get_db)
 ):
-    """Atualiza uma rota"""
-    db_route = db.query(Route).filter(Route.id == route_id).first()
+    """
+    Atualiza uma rota; se origem ou destino mudaram, reestima a distância e
+    a duração. Sem estimativa (cidade fora do gazetteer ou gazetteer
+    indisponível) os valores atuais são mantidos.
+
+    Se a duração mudou, o arrival_time das viagens futuras da rota é
+    recalculado no banco, em blocos.
+    """
+    db_route = await db.get(Route, route_id)
     if not db_route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Rota com ID {route_id} não encontrada",
         )
 
+    previous_duration = db_route.estimated_duration_min
+    cities_changed = (route.origin_city, route.destination_city) != (
+        db_route.origin_city, db_route.destination_city
+    )
+
     # Atualiza campos básicos
     db_route.name = route.name
     db_route.origin_city = route.origin_city
     db_route.destination_city = route.destination_city
+    if cities_changed:
+        estimate = route_distance_engine.estimate(route.origin_city, route.destination_city)
+        if estimate is not None:
+            db_route.distance_km, db_route.estimated_duration_min = estimate
 
-    db.commit()
-    db.refresh(db_route)
+    await db.commit()
+    await db.refresh(db_route)
+    if db_route.estimated_duration_min != previous_duration:
+        await recompute_arrival_times(db, [route_id])
+    response_cache.invalidate("routes", "trips")
 
     return db_route
 
 
 @router.delete("/{route_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_route(route_id: int, db: Session = Depends(get_db)):
+async def delete_route(route_id: int, db: AsyncSession = Depends(get_db)):
     """Deleta uma rota"""
-    db_route = db.query(Route).filter(Route.id == route_id).first()
+    db_route = await db.get(Route, route_id)
     if not db_route:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Rota com ID {route_id} não encontrada",
         )
 
-    db.delete(db_route)
-    db.commit()
+    await db.delete(db_route)
+    await db.commit()
+    response_cache.invalidate("routes", "trips")
     return None
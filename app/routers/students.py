@@ -1,48 +1,164 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
-from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+from datetime import date, datetime, timedelta
+import json
+import os
+import time
 
 from app.db import get_db
+from app.export import ExportFormat, export_response
 from app.models import Student
-from app.schemas import StudentCreate, StudentUpdate, StudentResponse
-from app.services import validate_student_eligibility, validate_cep
+from app.normalize import escape_like, normalize_city
+from app.pagination import decode_cursor, set_next_cursor
+from app.serialization import json_response, rows_to_dicts, schema_columns
+from app.server_timing import TimedRoute
+from app.schemas import (
+    StudentBulkItemResult,
+    StudentBulkResponse,
+    StudentCreate,
+    StudentUpdate,
+    StudentResponse,
+)
+from app.services import (
+    STUDENT_VALIDATION_MODE,
+    ValidationDeadlineExceeded,
+    run_student_validations,
+    validate_cep,
+    validate_ceps,
+    validate_eligibilities,
+)
 
-router = APIRouter(prefix="/students", tags=["students"])
+router = APIRouter(prefix="/students", tags=["students"], route_class=TimedRoute)
+
+# Cadastro em lote: linhas processadas por vez, chamadas externas simultâneas
+# e tamanho máximo do lote
+# (limitado a 4000 linhas: 7 colunas por linha ficam abaixo do teto de
+# 32767 parâmetros por comando do PostgreSQL)
+STUDENT_BULK_CHUNK_SIZE = min(int(os.getenv("STUDENT_BULK_CHUNK_SIZE", "500")), 4000)
+STUDENT_BULK_CONCURRENCY = int(os.getenv("STUDENT_BULK_CONCURRENCY", "10"))
+STUDENT_BULK_MAX_ROWS = int(os.getenv("STUDENT_BULK_MAX_ROWS", "50000"))
+
+
+class StudentFilters:
+    """Filtros de estudantes compartilhados pela listagem e pela exportação"""
+
+    def __init__(
+        self,
+        city: Optional[str] = Query(None, description="Filtrar por cidade (sem diferenciar acentos e maiúsculas)"),
+        city_match: Literal["contains", "prefix", "exact"] = Query(
+            "contains",
+            description="Como comparar 'city': substring (padrão), prefixo ou nome exato; "
+            "prefix e exact usam o índice B-tree",
+        ),
+        city_ibge_code: Optional[str] = Query(None, description="Filtrar pelo código IBGE da cidade"),
+        created_at: Optional[date] = Query(None, description="Filtrar por data de criação (formato: YYYY-MM-DD)"),
+    ):
+        self.city = city
+        self.city_match = city_match
+        self.city_ibge_code = city_ibge_code
+        self.created_at = created_at
+
+    def apply(self, query):
+        # Aplica filtro de cidade se fornecido (coluna normalizada e indexada)
+        if self.city:
+            normalized = normalize_city(self.city)
+            if self.city_match == "exact":
+                query = query.where(Student.city_normalized == normalized)
+            elif self.city_match == "prefix":
+                # Padrão montado aqui (e não com '||' no SQL) para o planner
+                # reconhecer o prefixo e usar o índice text_pattern_ops
+                query = query.where(
+                    Student.city_normalized.like(f"{escape_like(normalized)}%", escape="\\")
+                )
+            else:
+                # Substring, como o ILIKE '%x%' original; usa o índice trigram
+                # quando a extensão pg_trgm está disponível
+                query = query.where(
+                    Student.city_normalized.like(f"%{escape_like(normalized)}%", escape="\\")
+                )
+
+        if self.city_ibge_code:
+            query = query.where(Student.city_ibge_code == self.city_ibge_code)
+
+        # Aplica filtro de data de criação se fornecido
+        if self.created_at:
+            # Filtra estudantes criados na data especificada
+            start_of_day = datetime.combine(self.created_at, datetime.min.time())
+            end_of_day = start_of_day + timedelta(days=1)
+            query = query.where(Student.created_at >= start_of_day, Student.created_at < end_of_day)
+
+        return query
 
 
 @router.get("/", response_model=List[StudentResponse])
-def get_students(
+async def get_students(
     skip: int = 0,
     limit: int = 100,
-    city: Optional[str] = Query(None, description="Filtrar por cidade"),
-    created_at: Optional[date] = Query(None, description="Filtrar por data de criação (formato: YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor); substitui skip"),
+    filters: StudentFilters = Depends(),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Busca todos estudantes com paginação e filtros opcionais por cidade e data de criação"""
-    query = db.query(Student)
-    
-    # Aplica filtro de cidade se fornecido
-    if city:
-        query = query.filter(Student.city.ilike(f"%{city}%"))
-    
-    # Aplica filtro de data de criação se fornecido
-    if created_at:
-        # Filtra estudantes criados na data especificada
-        from datetime import datetime, timedelta
-        start_of_day = datetime.combine(created_at, datetime.min.time())
-        end_of_day = start_of_day + timedelta(days=1)
-        query = query.filter(Student.created_at >= start_of_day, Student.created_at < end_of_day)
-    
-    students = query.offset(skip).limit(limit).all()
-    return students
+    """
+    Busca todos estudantes com paginação e filtros opcionais por cidade, código
+    IBGE e data de criação.
+
+    Os estudantes vêm ordenados por (created_at, id). Quando a página vem
+    cheia, o header X-Next-Cursor traz o cursor da próxima; com 'cursor' o
+    custo de cada página é constante, independente da profundidade.
+    """
+    # Colunas do StudentResponse direto em dicts: sem objetos ORM nem revalidação
+    query = filters.apply(
+        select(*schema_columns(Student, StudentResponse)).order_by(Student.created_at, Student.id)
+    )
+
+    if cursor:
+        # Paginação por keyset: continua depois do último (created_at, id) visto
+        last_created_at, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(Student.created_at, Student.id) > tuple_(last_created_at, last_id)
+        )
+    else:
+        query = query.offset(skip)
+
+    students = rows_to_dicts(await db.execute(query.limit(limit)))
+    response = json_response(students)
+    set_next_cursor(response, students, limit, "created_at", "id")
+    return response
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_students(
+    export_format: ExportFormat = Query("ndjson", alias="format", description="ndjson ou csv"),
+    filters: StudentFilters = Depends(),
+):
+    """
+    Exporta todos os estudantes em streaming (NDJSON ou CSV), com os mesmos
+    filtros de GET /students. A memória usada não cresce com o número de linhas.
+    """
+    statement = filters.apply(
+        select(
+            Student.id,
+            Student.name,
+            Student.email,
+            Student.cep,
+            Student.city,
+            Student.city_ibge_code,
+            Student.created_at,
+        ).order_by(Student.created_at, Student.id)
+    )
+    return export_response(statement, export_format, "students")
 
 
 @router.get("/{student_id}", response_model=StudentResponse)
-def get_student(student_id: int, db: Session = Depends(get_db)):
+async def get_student(student_id: int, db: AsyncSession = Depends(get_db)):
     """Busca um estudante pelo ID"""
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await db.get(Student, student_id)
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,29 +167,51 @@ def get_student(student_id: int, db: Session = Depends(get_db)):
     return student
 
 
+def _validation_headers(started: float) -> Dict[str, str]:
+    """Modo e duração da validação (CEP + elegibilidade) desde 'started'"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {
+        "X-Validation-Mode": STUDENT_VALIDATION_MODE,
+        "X-Validation-Time-Ms": f"{elapsed_ms:.1f}",
+    }
+
+
 @router.post("/", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
-async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
+async def create_student(
+    student: StudentCreate, response: Response, db: AsyncSession = Depends(get_db)
+):
     """Cria um novo estudante com validação de CEP via ViaCEP e validação via API externa"""
     
-    # 1. Valida o CEP usando ViaCEP
-    cep_result = await validate_cep(student.cep)
+    # 1 e 2. Valida o CEP (ViaCEP) e a elegibilidade (API externa, usando CEP
+    # como registration) - em paralelo ou em sequência, conforme o modo
+    started = time.perf_counter()
+    try:
+        cep_result, validation_result = await run_student_validations(
+            student.name, student.email, student.cep
+        )
+    except ValidationDeadlineExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e),
+            headers=_validation_headers(started),
+        )
+    # Também nas respostas de erro: é quando o tempo da validação mais importa
+    validation_headers = _validation_headers(started)
+    response.headers.update(validation_headers)
     
-    if not cep_result["is_valid"]:
+    if cep_result is not None and not cep_result["is_valid"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"CEP inválido: {cep_result['reason']}",
+            headers=validation_headers,
         )
     
-    # 2. Valida o estudante via API externa (usando CEP como registration)
-    validation_result = await validate_student_eligibility(
-        student.name, student.email, student.cep
-    )
-    
     # Se não for válido, retorna erro 400
-    if not validation_result["is_valid"]:
+    if validation_result is not None and not validation_result["is_valid"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Validação do estudante falhou: {validation_result['reason']}",
+            headers=validation_headers,
         )
     
     # 3. Cria o estudante no banco com dados do ViaCEP
@@ -87,23 +225,261 @@ async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
     
     try:
         db.add(db_student)
-        db.commit()
-        db.refresh(db_student)
+        await db.commit()
+        await db.refresh(db_student)
         return db_student
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Estudante com email {student.email} já existe",
+            headers=validation_headers,
+        )
+
+
+class _Truncated(int):
+    """Quantidade de linhas NDJSON descartadas além de STUDENT_BULK_MAX_ROWS"""
+
+
+def _parse_bulk_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+async def _iter_bulk_records(request: Request, max_rows: int) -> AsyncIterator[Any]:
+    """
+    Lê o corpo do cadastro em lote: array JSON ou NDJSON (um estudante por
+    linha). NDJSON é lido de forma incremental, sem carregar o corpo inteiro.
+    Linhas que não são JSON válido são entregues como a exceção do parse.
+
+    Um array JSON com mais de max_rows itens é recusado (413) antes de
+    qualquer escrita no banco. Em NDJSON a leitura para de decodificar no
+    limite: as linhas seguintes só são contadas, e o total descartado chega
+    uma única vez, no fim, como _Truncated.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        count = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    count += 1
+                    if count <= max_rows:
+                        yield _parse_bulk_line(line)
+        if buffer.strip():
+            count += 1
+            if count <= max_rows:
+                yield _parse_bulk_line(buffer)
+        if count > max_rows:
+            yield _Truncated(count - max_rows)
+        return
+
+    try:
+        records = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Corpo inválido: envie um array JSON ou NDJSON (application/x-ndjson)",
+        )
+    if not isinstance(records, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Corpo inválido: esperado um array de estudantes",
+        )
+    if len(records) > max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote excede o limite de {max_rows} estudantes",
+        )
+    for record in records:
+        yield record
+
+
+async def _enroll_chunk(
+    rows: List[Tuple[int, StudentCreate]], db: AsyncSession
+) -> List[StudentBulkItemResult]:
+    """
+    Valida e insere um bloco de estudantes já sem emails repetidos.
+
+    Cada bloco é confirmado na própria transação: se o INSERT de um bloco
+    falha, só as linhas dele voltam como 'error' e os blocos anteriores
+    continuam gravados (o lote não é atômico).
+    """
+    results: List[StudentBulkItemResult] = []
+
+    # 1. Um CEP distinto = uma consulta (cache e single-flight cobrem o resto)
+    cep_results = await validate_ceps(
+        [student.cep for _, student in rows], STUDENT_BULK_CONCURRENCY
+    )
+    valid_rows = []
+    for index, student in rows:
+        cep_result = cep_results[student.cep.replace("-", "")]
+        if cep_result["is_valid"]:
+            valid_rows.append((index, student, cep_result))
+        else:
+            results.append(StudentBulkItemResult(
+                index=index, email=student.email, status="invalid",
+                detail=f"CEP inválido: {cep_result['reason']}",
+            ))
+
+    # 2. Elegibilidade em paralelo, só para quem passou na validação de CEP
+    eligibility = await validate_eligibilities(
+        [(student.name, student.email, student.cep) for _, student, _ in valid_rows],
+        STUDENT_BULK_CONCURRENCY,
+    )
+    to_insert = []
+    for (index, student, cep_result), validation_result in zip(valid_rows, eligibility):
+        if validation_result["is_valid"]:
+            to_insert.append((index, student, cep_result))
+        else:
+            results.append(StudentBulkItemResult(
+                index=index, email=student.email, status="invalid",
+                detail=f"Validação do estudante falhou: {validation_result['reason']}",
+            ))
+
+    if not to_insert:
+        return results
+
+    # 3. INSERT multi-linha; emails já cadastrados são ignorados pelo ON CONFLICT
+    now = datetime.utcnow()
+    statement = (
+        pg_insert(Student)
+        .values([
+            {
+                "name": student.name,
+                "email": student.email,
+                "cep": student.cep,
+                "city": cep_result["city"],
+                "city_normalized": normalize_city(cep_result["city"]),
+                "city_ibge_code": cep_result["city_ibge_code"],
+                "created_at": now,
+            }
+            for _, student, cep_result in to_insert
+        ])
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(Student.id, Student.email)
+    )
+    try:
+        inserted = {email: student_id for student_id, email in (await db.execute(statement)).all()}
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        print(f"Falha ao gravar bloco do cadastro em lote: {e}")
+        results.extend(
+            StudentBulkItemResult(
+                index=index, email=student.email, status="error",
+                detail="Falha ao gravar no banco; reenvie esta linha",
+            )
+            for index, student, _ in to_insert
         )
+        return results
+
+    for index, student, _ in to_insert:
+        if student.email in inserted:
+            results.append(StudentBulkItemResult(
+                index=index, email=student.email, status="created",
+                student_id=inserted[student.email],
+            ))
+        else:
+            results.append(StudentBulkItemResult(
+                index=index, email=student.email, status="duplicate",
+                detail=f"Estudante com email {student.email} já existe",
+            ))
+    return results
+
+
+@router.post(
+    "/bulk",
+    response_model=StudentBulkResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/StudentCreate"}}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def create_students_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Cadastra estudantes em lote (array JSON ou NDJSON).
+
+    Cada CEP distinto é consultado uma vez, a elegibilidade é validada em
+    paralelo e os inserts são feitos em blocos com INSERT ... ON CONFLICT
+    (email). Retorna o resultado de cada linha, na ordem enviada.
+
+    Arrays JSON acima de STUDENT_BULK_MAX_ROWS são recusados com 413; em
+    NDJSON as linhas além do limite não são processadas e só a quantidade
+    delas volta em 'truncated'. Os blocos são gravados separadamente: uma
+    falha de banco marca as linhas do bloco como 'error' sem desfazer os
+    anteriores.
+    """
+    results: List[StudentBulkItemResult] = []
+    seen_emails: Dict[str, int] = {}
+    pending: List[Tuple[int, StudentCreate]] = []
+    total = 0
+    truncated = 0
+
+    async for record in _iter_bulk_records(request, STUDENT_BULK_MAX_ROWS):
+        if isinstance(record, _Truncated):
+            truncated = int(record)
+            continue
+        index = total
+        total += 1
+        if isinstance(record, ValueError):
+            results.append(StudentBulkItemResult(
+                index=index, status="invalid", detail=f"JSON inválido: {record}",
+            ))
+            continue
+        try:
+            student = StudentCreate.model_validate(record)
+        except ValidationError as e:
+            results.append(StudentBulkItemResult(
+                index=index,
+                email=record.get("email") if isinstance(record, dict) else None,
+                status="invalid",
+                detail="; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()),
+            ))
+            continue
+
+        if student.email in seen_emails:
+            results.append(StudentBulkItemResult(
+                index=index, email=student.email, status="duplicate",
+                detail=f"Email repetido no lote (índice {seen_emails[student.email]})",
+            ))
+            continue
+        seen_emails[student.email] = index
+
+        pending.append((index, student))
+        if len(pending) >= STUDENT_BULK_CHUNK_SIZE:
+            results.extend(await _enroll_chunk(pending, db))
+            pending = []
+
+    if pending:
+        results.extend(await _enroll_chunk(pending, db))
+
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.status == "created")
+    return StudentBulkResponse(
+        total=total, created=created, failed=total - created,
+        truncated=truncated, results=results,
+    )
 
 
 @router.put("/{student_id}", response_model=StudentResponse)
 async def update_student(
-    student_id: int, student: StudentUpdate, db: Session = Depends(get_db)
+    student_id: int, student: StudentUpdate, db: AsyncSession = Depends(get_db)
 ):
     """Atualiza um estudante com validação de CEP"""
-    db_student = db.query(Student).filter(Student.id == student_id).first()
+    db_student = await db.get(Student, student_id)
     if not db_student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -127,11 +503,11 @@ async def update_student(
     db_student.city_ibge_code = cep_result["city_ibge_code"]
 
     try:
-        db.commit()
-        db.refresh(db_student)
+        await db.commit()
+        await db.refresh(db_student)
         return db_student
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Estudante com email {student.email} já existe",
@@ -139,15 +515,15 @@ async def update_student(
 
 
 @router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_student(student_id: int, db: Session = Depends(get_db)):
+async def delete_student(student_id: int, db: AsyncSession = Depends(get_db)):
     """Deleta um estudante"""
-    db_student = db.query(Student).filter(Student.id == student_id).first()
+    db_student = await db.get(Student, student_id)
     if not db_student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Estudante com ID {student_id} não encontrado",
         )
 
-    db.delete(db_student)
-    db.commit()
+    await db.delete(db_student)
+    await db.commit()
     return None
@@ -1,26 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Literal, Optional, Union
+from datetime import datetime
+import os
 
 from app.db import get_db
+from app.export import ExportFormat, export_response
+from app.pagination import decode_cursor, set_next_cursor
+from app.serialization import json_response, rows_to_dicts, schema_columns
 from app.models import Trip, Route
-from app.schemas import TripCreate, TripUpdate, TripResponse, TripWithRouteResponse
-from app.services import calculate_arrival_time
+from app.normalize import normalize_city
+from app.response_cache import CachedRoute, cached, response_cache
+from app.schemas import (
+    TripCreate,
+    TripUpdate,
+    TripResponse,
+    TripWithRouteResponse,
+    RouteResponse,
+    TripTimetable,
+    TripTimetableResponse,
+    SeatReservation,
+    BatchSeatReservation,
+    SeatReservationResponse,
+    BatchSeatReservationResponse,
+    UtcDatetime,
+)
+from app.services import calculate_arrival_time, expand_timetable
 
-router = APIRouter(prefix="/trips", tags=["trips"])
+router = APIRouter(prefix="/trips", tags=["trips"], route_class=CachedRoute)
 
+# Quadro de horários: linhas por INSERT multi-linha e máximo de viagens
+# (limitado a 6000 linhas: 5 colunas por linha ficam abaixo do teto de
+# 32767 parâmetros por comando do PostgreSQL)
+TIMETABLE_BATCH_SIZE = min(int(os.getenv("TIMETABLE_BATCH_SIZE", "2000")), 6000)
+TIMETABLE_MAX_TRIPS = int(os.getenv("TIMETABLE_MAX_TRIPS", "50000"))
+TIMETABLE_MAX_DAYS = 366
 
-@router.get("/", response_model=List[TripResponse])
-def get_trips(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Busca todas as viagens com paginação"""
-    trips = db.query(Trip).offset(skip).limit(limit).all()
-    return trips
+
+def _trip_columns_query(include: Optional[str]):
+    """
+    SELECT das colunas do TripResponse (e da rota, com include=route).
+
+    As listagens montam o JSON direto dessas colunas, sem objetos ORM; o
+    chamador faz o JOIN com Route quando inclui a rota.
+    """
+    columns = schema_columns(Trip, TripResponse)
+    if include == "route":
+        columns += schema_columns(Route, RouteResponse, relation="route")
+    return select(*columns)
+
+
+@router.get("/", response_model=List[Union[TripWithRouteResponse, TripResponse]])
+@cached("trips")
+async def get_trips(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor); substitui skip"),
+    include: Optional[Literal["route"]] = Query(None, description="'route' inclui os detalhes da rota de cada viagem"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Busca todas as viagens com paginação.
+
+    Ordenadas por id; o header X-Next-Cursor traz o cursor da próxima página.
+    Com include=route cada viagem traz a sua rota, carregada no mesmo SELECT
+    (JOIN), sem uma consulta extra por viagem.
+    """
+    query = _trip_columns_query(include).order_by(Trip.id)
+    if include == "route":
+        query = query.join(Trip.route)
+    if cursor:
+        # Paginação por keyset: custo constante em qualquer profundidade
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.where(Trip.id > last_id)
+    else:
+        query = query.offset(skip)
+
+    trips = rows_to_dicts(await db.execute(query.limit(limit)))
+    response = json_response(trips)
+    set_next_cursor(response, trips, limit, "id")
+    return response
+
+
+@router.get("/search", response_model=List[Union[TripWithRouteResponse, TripResponse]])
+@cached("trips")
+async def search_trips(
+    origin_city: Optional[str] = Query(None, description="Cidade de origem (sem diferenciar acentos e maiúsculas)"),
+    destination_city: Optional[str] = Query(None, description="Cidade de destino (sem diferenciar acentos e maiúsculas)"),
+    departure_from: Optional[UtcDatetime] = Query(None, description="Partida a partir de (inclusive)"),
+    departure_to: Optional[UtcDatetime] = Query(None, description="Partida até (exclusive)"),
+    min_seats: int = Query(1, ge=0, description="Mínimo de assentos disponíveis"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    include: Optional[Literal["route"]] = Query(None, description="'route' inclui os detalhes da rota de cada viagem"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Busca viagens entre duas cidades numa janela de partida, com assentos livres.
+
+    Os resultados vêm ordenados por (departure_time, id). Com origem/destino
+    o planner parte de ix_routes_origin_destination e percorre
+    ix_trips_route_id_departure_time só na janela pedida; sem cidades, usa
+    ix_trips_departure_time.
+    """
+    if departure_from and departure_to and departure_from >= departure_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="departure_from deve ser anterior a departure_to",
+        )
+
+    query = _trip_columns_query(include).order_by(Trip.departure_time, Trip.id)
+    # Um único JOIN serve ao filtro por cidade e às colunas da rota
+    if origin_city or destination_city or include == "route":
+        query = query.join(Trip.route)
+    if origin_city:
+        query = query.where(Route.origin_city_normalized == normalize_city(origin_city))
+    if destination_city:
+        query = query.where(Route.destination_city_normalized == normalize_city(destination_city))
+
+    if departure_from:
+        query = query.where(Trip.departure_time >= departure_from)
+    if departure_to:
+        query = query.where(Trip.departure_time < departure_to)
+    if min_seats:
+        query = query.where(Trip.available_seats >= min_seats)
+
+    if cursor:
+        last_departure, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(Trip.departure_time, Trip.id) > tuple_(last_departure, last_id)
+        )
+
+    trips = rows_to_dicts(await db.execute(query.limit(limit)))
+    response = json_response(trips)
+    set_next_cursor(response, trips, limit, "departure_time", "id")
+    return response
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_trips(
+    export_format: ExportFormat = Query("ndjson", alias="format", description="ndjson ou csv"),
+):
+    """Exporta todas as viagens em streaming (NDJSON ou CSV), ordenadas por id"""
+    statement = select(
+        Trip.id,
+        Trip.route_id,
+        Trip.bus_plate,
+        Trip.departure_time,
+        Trip.arrival_time,
+        Trip.available_seats,
+    ).order_by(Trip.id)
+    return export_response(statement, export_format, "trips")
 
 
 @router.get("/{trip_id}", response_model=TripWithRouteResponse)
-def get_trip(trip_id: int, db: Session = Depends(get_db)):
+@cached("trips")
+async def get_trip(trip_id: int, db: AsyncSession = Depends(get_db)):
     """Busca uma viagem pelo ID com detalhes da rota"""
-    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    # A rota é carregada junto: lazy load não é permitido na sessão assíncrona
+    trip = await db.get(Trip, trip_id, options=[joinedload(Trip.route)])
     if not trip:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -30,10 +171,14 @@ def get_trip(trip_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
-def create_trip(trip: TripCreate, db: Session = Depends(get_db)):
+async def create_trip(trip: TripCreate, db: AsyncSession = Depends(get_db)):
     """Cria uma nova viagem"""
-    # Valida se a rota existe
-    route = db.query(Route).filter(Route.id == trip.route_id).first()
+    # Valida se a rota existe, buscando só a duração usada no cálculo
+    route = (
+        await db.execute(
+            select(Route.id, Route.estimated_duration_min).where(Route.id == trip.route_id)
+        )
+    ).first()
     if not route:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -54,15 +199,188 @@ def create_trip(trip: TripCreate, db: Session = Depends(get_db)):
     )
 
     db.add(db_trip)
-    db.commit()
-    db.refresh(db_trip)
+    # Sem refresh: o id volta no INSERT e não há colunas com default no servidor
+    await db.commit()
+    response_cache.invalidate("trips")
     return db_trip
 
 
+@router.post("/timetable", response_model=TripTimetableResponse, status_code=status.HTTP_201_CREATED)
+async def create_timetable(timetable: TripTimetable, db: AsyncSession = Depends(get_db)):
+    """
+    Cria de uma vez as viagens de um quadro de horários recorrente.
+
+    O quadro (dias da semana, horários, período e exceções) é expandido em
+    memória, com o arrival_time já calculado pela duração da rota, e as
+    viagens são inseridas em INSERTs multi-linha de TIMETABLE_BATCH_SIZE
+    numa única transação: tudo ou nada. Partidas que a rota já tem são
+    puladas, então reenviar o mesmo quadro não duplica viagens.
+    """
+    if timetable.end_date < timetable.start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date deve ser igual ou posterior a start_date",
+        )
+    if (timetable.end_date - timetable.start_date).days >= TIMETABLE_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O período do quadro é limitado a {TIMETABLE_MAX_DAYS} dias",
+        )
+
+    route = (
+        await db.execute(
+            select(Route.id, Route.estimated_duration_min).where(Route.id == timetable.route_id)
+        )
+    ).first()
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Rota com ID {timetable.route_id} não encontrada",
+        )
+
+    departures = expand_timetable(
+        timetable.start_date,
+        timetable.end_date,
+        timetable.weekdays,
+        timetable.departure_times,
+        timetable.exceptions,
+    )
+    if len(departures) > TIMETABLE_MAX_TRIPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O quadro gera {len(departures)} viagens; o máximo é {TIMETABLE_MAX_TRIPS}",
+        )
+
+    existing = set()
+    if departures:
+        # Uma consulta pelo índice (route_id, departure_time) cobre o período todo
+        existing = set(
+            (
+                await db.execute(
+                    select(Trip.departure_time).where(
+                        Trip.route_id == route.id,
+                        Trip.departure_time.between(departures[0], departures[-1]),
+                    )
+                )
+            ).scalars()
+        )
+    new_departures = [departure for departure in departures if departure not in existing]
+
+    rows = [
+        {
+            "route_id": route.id,
+            "bus_plate": timetable.bus_plate,
+            "departure_time": departure,
+            "arrival_time": calculate_arrival_time(departure, route.estimated_duration_min),
+            "available_seats": timetable.available_seats,
+        }
+        for departure in new_departures
+    ]
+    for start in range(0, len(rows), TIMETABLE_BATCH_SIZE):
+        await db.execute(insert(Trip).values(rows[start:start + TIMETABLE_BATCH_SIZE]))
+    await db.commit()
+    if rows:
+        response_cache.invalidate("trips")
+
+    return TripTimetableResponse(
+        route_id=route.id,
+        created=len(rows),
+        skipped_existing=len(departures) - len(rows),
+        first_departure=new_departures[0] if new_departures else None,
+        last_departure=new_departures[-1] if new_departures else None,
+    )
+
+
+async def _reserve_seats(db: AsyncSession, trip_id: int, seats: int) -> Optional[int]:
+    """
+    Decrementa os assentos da viagem num único UPDATE condicional.
+
+    A checagem e o decremento acontecem no mesmo comando, sob o lock da
+    linha: duas reservas simultâneas nunca leem o mesmo saldo. Retorna os
+    assentos restantes, ou None se a viagem não existe ou não tem assentos
+    suficientes.
+    """
+    result = await db.execute(
+        update(Trip)
+        .where(Trip.id == trip_id, Trip.available_seats >= seats)
+        .values(available_seats=Trip.available_seats - seats)
+        .returning(Trip.available_seats)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _reservation_failed(db: AsyncSession, trip_id: int, seats: int) -> HTTPException:
+    """404 se a viagem não existe, 409 se faltam assentos"""
+    await db.rollback()
+    available = await db.scalar(select(Trip.available_seats).where(Trip.id == trip_id))
+    if available is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Viagem com ID {trip_id} não encontrada",
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Viagem {trip_id} tem {available} assento(s) disponível(is); {seats} solicitado(s)",
+    )
+
+
+@router.post("/reserve", response_model=BatchSeatReservationResponse)
+async def reserve_batch(reservation: BatchSeatReservation, db: AsyncSession = Depends(get_db)):
+    """
+    Reserva assentos em várias viagens de uma vez (tudo ou nada).
+
+    Os UPDATEs rodam em ordem de trip_id numa única transação: lotes
+    concorrentes travam as linhas sempre na mesma ordem, sem deadlock. Se
+    alguma viagem não tiver assentos suficientes, nada é reservado.
+    """
+    # Pedidos repetidos para a mesma viagem viram um só decremento
+    requested = {}
+    for item in reservation.items:
+        requested[item.trip_id] = requested.get(item.trip_id, 0) + item.seats
+
+    reservations = []
+    for trip_id in sorted(requested):
+        seats = requested[trip_id]
+        available = await _reserve_seats(db, trip_id, seats)
+        if available is None:
+            raise await _reservation_failed(db, trip_id, seats)
+        reservations.append(
+            SeatReservationResponse(trip_id=trip_id, reserved=seats, available_seats=available)
+        )
+
+    await db.commit()
+    response_cache.invalidate("trips")
+    return BatchSeatReservationResponse(reservations=reservations)
+
+
+@router.post("/{trip_id}/reserve", response_model=SeatReservationResponse)
+async def reserve_seats(
+    trip_id: int, reservation: SeatReservation, db: AsyncSession = Depends(get_db)
+):
+    """Reserva um ou mais assentos de uma viagem sem ler-modificar-gravar"""
+    available = await _reserve_seats(db, trip_id, reservation.seats)
+    if available is None:
+        raise await _reservation_failed(db, trip_id, reservation.seats)
+
+    # Commit imediato: o lock da linha dura só o UPDATE e o COMMIT
+    await db.commit()
+    response_cache.invalidate("trips")
+    return SeatReservationResponse(
+        trip_id=trip_id, reserved=reservation.seats, available_seats=available
+    )
+
+
 @router.put("/{trip_id}", response_model=TripResponse)
-def update_trip(trip_id: int, trip: TripUpdate, db: Session = Depends(get_db)):
+async def update_trip(trip_id: int, trip: TripUpdate, db: AsyncSession = Depends(get_db)):
     """Atualiza uma viagem"""
-    db_trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    update_data = trip.model_dump(exclude_unset=True)
+    # Recalcula o horário de chegada se departure_time mudou e arrival_time não foi fornecido explicitamente
+    needs_route = "departure_time" in update_data and "arrival_time" not in update_data
+
+    # A rota vem no mesmo SELECT da viagem quando o recálculo vai precisar dela
+    options = [joinedload(Trip.route)] if needs_route else []
+    db_trip = await db.get(Trip, trip_id, options=options)
     if not db_trip:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,32 +388,30 @@ def update_trip(trip_id: int, trip: TripUpdate, db: Session = Depends(get_db)):
         )
 
     # Atualiza apenas os campos fornecidos
-    update_data = trip.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_trip, key, value)
 
-    # Recalcula o horário de chegada se departure_time mudou e arrival_time não foi fornecido explicitamente
-    if "departure_time" in update_data and "arrival_time" not in update_data:
-        route = db.query(Route).filter(Route.id == db_trip.route_id).first()
+    if needs_route:
         db_trip.arrival_time = calculate_arrival_time(
-            db_trip.departure_time, route.estimated_duration_min
+            db_trip.departure_time, db_trip.route.estimated_duration_min
         )
 
-    db.commit()
-    db.refresh(db_trip)
+    await db.commit()
+    response_cache.invalidate("trips")
     return db_trip
 
 
 @router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_trip(trip_id: int, db: Session = Depends(get_db)):
+async def delete_trip(trip_id: int, db: AsyncSession = Depends(get_db)):
     """Deleta uma viagem"""
-    db_trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    db_trip = await db.get(Trip, trip_id)
     if not db_trip:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Viagem com ID {trip_id} não encontrada",
         )
 
-    db.delete(db_trip)
-    db.commit()
+    await db.delete(db_trip)
+    await db.commit()
+    response_cache.invalidate("trips")
     return None
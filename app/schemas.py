@@ -1,6 +1,11 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from datetime import datetime
-from typing import Optional
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, ConfigDict, field_validator
+from datetime import date, datetime, time
+from typing import Annotated, List, Literal, Optional
+
+from app.normalize import to_naive_utc
+
+# Datas e horas com fuso ('Z', '+03:00') são gravadas e comparadas em UTC sem fuso
+UtcDatetime = Annotated[datetime, AfterValidator(to_naive_utc)]
 
 
 class StudentBase(BaseModel):
@@ -26,6 +31,23 @@ class StudentResponse(StudentBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class StudentBulkItemResult(BaseModel):
+    index: int
+    email: Optional[str] = None
+    status: Literal["created", "duplicate", "invalid", "error"]
+    student_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class StudentBulkResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    # Linhas NDJSON além de STUDENT_BULK_MAX_ROWS, descartadas sem processar
+    truncated: int = 0
+    results: List[StudentBulkItemResult]
+
+
 class RouteBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=200)
     origin_city: str = Field(..., min_length=1, max_length=100)
@@ -48,10 +70,25 @@ class RouteResponse(RouteBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RouteRecomputeResponse(BaseModel):
+    routes: int
+    updated: int
+    unresolved: int
+    unresolved_cities: List[str]
+    trips_updated: int
+
+
+class ArrivalRecomputeResponse(BaseModel):
+    route_id: int
+    estimated_duration_min: Optional[int] = None
+    dry_run: bool
+    trips: int
+
+
 class TripBase(BaseModel):
     route_id: int
     bus_plate: Optional[str] = Field(None, max_length=20)
-    departure_time: datetime
+    departure_time: UtcDatetime
     available_seats: int = Field(..., ge=0)
 
 
@@ -61,8 +98,8 @@ class TripCreate(TripBase):
 
 class TripUpdate(BaseModel):
     bus_plate: Optional[str] = Field(None, max_length=20)
-    departure_time: Optional[datetime] = None
-    arrival_time: Optional[datetime] = None
+    departure_time: Optional[UtcDatetime] = None
+    arrival_time: Optional[UtcDatetime] = None
     available_seats: Optional[int] = Field(None, ge=0)
 
 
@@ -77,3 +114,54 @@ class TripWithRouteResponse(TripResponse):
     route: RouteResponse
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TripTimetable(BaseModel):
+    route_id: int
+    weekdays: List[Annotated[int, Field(ge=1, le=7)]] = Field(
+        ..., min_length=1, max_length=7, description="Dias da semana ISO: 1 = segunda ... 7 = domingo"
+    )
+    departure_times: List[time] = Field(..., min_length=1, max_length=96)
+    start_date: date
+    end_date: date = Field(..., description="Último dia do quadro (inclusive)")
+    exceptions: List[date] = Field(default_factory=list, description="Datas sem viagens (feriados, recessos)")
+    bus_plate: Optional[str] = Field(None, max_length=20)
+    available_seats: int = Field(..., ge=0)
+
+    @field_validator("departure_times")
+    @classmethod
+    def same_timezone_kind(cls, value: List[time]) -> List[time]:
+        # Horários com e sem fuso não são comparáveis (ordenação e duplicatas)
+        if len({departure.tzinfo is None for departure in value}) > 1:
+            raise ValueError("departure_times não pode misturar horários com e sem fuso horário")
+        return value
+
+
+class TripTimetableResponse(BaseModel):
+    route_id: int
+    created: int
+    skipped_existing: int
+    first_departure: Optional[datetime] = None
+    last_departure: Optional[datetime] = None
+
+
+class SeatReservation(BaseModel):
+    seats: int = Field(1, ge=1, le=100)
+
+
+class SeatReservationItem(SeatReservation):
+    trip_id: int
+
+
+class BatchSeatReservation(BaseModel):
+    items: List[SeatReservationItem] = Field(..., min_length=1, max_length=50)
+
+
+class SeatReservationResponse(BaseModel):
+    trip_id: int
+    reserved: int
+    available_seats: int
+
+
+class BatchSeatReservationResponse(BaseModel):
+    reservations: List[SeatReservationResponse]
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Optional, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy.engine import Result
+
+from app.server_timing import phase
+
+# Separador dos rótulos de colunas de um objeto aninhado ('route__name')
+NESTED_SEPARATOR = "__"
+
+
+def schema_columns(model, schema: Type[BaseModel], relation: Optional[str] = None) -> List[Any]:
+    """
+    Colunas do model correspondentes aos campos do schema de resposta, na
+    ordem do schema (a mesma ordem das chaves no JSON do response_model).
+
+    Args:
+        relation: rotula as colunas como '<relation>__<campo>' para que
+            rows_to_dicts as agrupe no objeto aninhado 'relation'
+    """
+    table_columns = model.__table__.columns
+    columns = []
+    for name in schema.model_fields:
+        if name not in table_columns:
+            continue
+        column = getattr(model, name)
+        columns.append(column.label(f"{relation}{NESTED_SEPARATOR}{name}") if relation else column)
+    return columns
+
+
+def rows_to_dicts(result: Result) -> List[Dict[str, Any]]:
+    """
+    Converte as linhas (tuplas de colunas, sem objetos ORM nem identity map)
+    em dicts prontos para o JSON.
+    """
+    keys = list(result.keys())
+    if not any(NESTED_SEPARATOR in key for key in keys):
+        return [dict(zip(keys, row)) for row in result]
+
+    plain = [(i, key) for i, key in enumerate(keys) if NESTED_SEPARATOR not in key]
+    nested: Dict[str, List] = {}
+    for i, key in enumerate(keys):
+        if NESTED_SEPARATOR in key:
+            relation, field = key.split(NESTED_SEPARATOR, 1)
+            nested.setdefault(relation, []).append((i, field))
+
+    rows = []
+    for row in result:
+        item = {key: row[i] for i, key in plain}
+        for relation, fields in nested.items():
+            item[relation] = {field: row[i] for i, field in fields}
+        rows.append(item)
+    return rows
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """
+    Resposta JSON codificada com orjson.
+
+    O endpoint que retorna uma Response pula a validação do response_model
+    e o encoder padrão do FastAPI: use só com dados que já saem no formato
+    do schema (colunas selecionadas com schema_columns).
+    """
+    with phase("serialize"):
+        body = orjson.dumps(content)
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,142 @@
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi.routing import APIRoute
+
+from app.config import env_bool
+from app.db import current_query_stats
+
+# Desligue em produção se a API for pública e o tempo das fases não deve vazar
+SERVER_TIMING_ENABLED = env_bool("SERVER_TIMING_ENABLED", True)
+
+
+class RequestTimings:
+    """Tempo acumulado por fase numa requisição"""
+
+    __slots__ = ("phases", "endpoint_finished")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.endpoint_finished: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+# Fases da requisição atual (definido pelo ServerTimingMiddleware)
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Mede um trecho da requisição atual como a fase 'name' do Server-Timing.
+
+    Fases que rodam em paralelo (CEP e elegibilidade no modo concorrente)
+    se sobrepõem; cada uma mostra o próprio tempo de parede. Fora de uma
+    requisição, ou com SERVER_TIMING_ENABLED=false, não mede nada.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def _mark_endpoint_finished(endpoint):
+    """Envolve o endpoint para marcar quando ele retorna (início da serialização)"""
+    # include_router recria as rotas com o mesmo route_class: envolve uma vez só
+    if getattr(endpoint, "_marks_endpoint_finished", False):
+        return endpoint
+
+    def mark():
+        timings = current_timings.get()
+        if timings is not None:
+            timings.endpoint_finished = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                mark()
+    wrapper._marks_endpoint_finished = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute que separa a fase 'serialize' do Server-Timing.
+
+    A serialização é o intervalo entre o retorno do endpoint e o envio dos
+    headers: validação do response_model e render do JSON.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_finished(endpoint), **kwargs)
+
+
+def _format_server_timing(timings: RequestTimings, total: float) -> bytes:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.phases.items()]
+    query_stats = current_query_stats.get()
+    if query_stats is not None:
+        entries.append(
+            f'db;dur={query_stats.seconds * 1000:.1f};desc="{query_stats.count} queries"'
+        )
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que adiciona o header Server-Timing a cada resposta.
+
+    Fases: viacep, validation e log (medidas em app/services.py), db (tempo
+    dos comandos SQL, do MetricsMiddleware), serialize (TimedRoute) e total.
+    Os navegadores mostram o detalhamento na aba Network do DevTools.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SERVER_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                if timings.endpoint_finished is not None:
+                    timings.add("serialize", now - timings.endpoint_finished)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _format_server_timing(timings, now - started)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
@@ -1,36 +1,78 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+import asyncio
 import os
+from app.audit_log import audit_log, make_record
+from app.cep_cache import cep_cache
+from app.cep_local import local_cep_resolver
 from app.external import validation_client
+from app.normalize import to_naive_utc
+from app.server_timing import phase
+from app.singleflight import SingleFlight
 from app.viacep import viacep_client
 
 
-# Configuração do arquivo de log
-LOG_FILE = "validations.log"
+# Agrupamento de consultas externas idênticas e simultâneas
+cep_flight = SingleFlight("cep")
+eligibility_flight = SingleFlight("eligibility")
+
+# Modo de validação no cadastro: 'concurrent' (CEP e elegibilidade em paralelo)
+# ou 'sequential' (CEP primeiro, elegibilidade só se o CEP for válido)
+STUDENT_VALIDATION_MODE = os.getenv("STUDENT_VALIDATION_MODE", "concurrent").lower()
+# Prazo total, em segundos, para as duas validações no modo concorrente
+STUDENT_VALIDATION_DEADLINE = float(os.getenv("STUDENT_VALIDATION_DEADLINE", "10.0"))
+
+
+class ValidationDeadlineExceeded(Exception):
+    """A validação de CEP não terminou dentro do prazo total"""
 
 
 def log_validation(validation_type: str, details: dict):
     """
-    Registra validações de CEP e elegibilidade em arquivo de texto local.
-    
+    Registra validações de CEP e elegibilidade no log de auditoria (JSON lines).
+
+    A gravação é feita em background pelo AuditLogWriter, sem bloquear o
+    event loop; esta função apenas enfileira o registro.
+
     Args:
         validation_type: Tipo de validação ('CEP' ou 'ELEGIBILIDADE')
         details: Dicionário com detalhes da validação
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] {validation_type} - {details}\n"
-    
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_entry)
-    except Exception as e:
-        # Em caso de erro ao escrever no arquivo, não interrompe o fluxo
-        print(f"Erro ao salvar log: {e}")
+    with phase("log"):
+        audit_log.log(make_record(validation_type, details))
+
+
+async def lookup_address(cep: str) -> Optional[Dict[str, Any]]:
+    """
+    Busca o endereço de um CEP: base local, cache e, por último, ViaCEP.
+
+    A base local (app/cep_local.py) responde sem rede; só os CEPs fora das
+    faixas importadas seguem para o cache e a ViaCEP. Chamadas simultâneas
+    para o mesmo CEP compartilham uma única consulta. Apenas respostas
+    definitivas da ViaCEP são cacheadas; falhas de rede ou timeouts seguem
+    sem cache para não rejeitar CEPs válidos.
+    """
+    clean_cep = cep.replace("-", "")
+    address = local_cep_resolver.lookup(clean_cep)
+    if address is not None:
+        return address
+    return await cep_flight.do(clean_cep, lambda: _resolve_address(cep, clean_cep))
+
+
+async def _resolve_address(cep: str, clean_cep: str) -> Optional[Dict[str, Any]]:
+    found, address = await cep_cache.get(clean_cep)
+    if found:
+        return address
+
+    address, definitive = await viacep_client.lookup(cep)
+    if definitive:
+        await cep_cache.set(clean_cep, address)
+    return address
 
 
 async def validate_cep(cep: str) -> dict:
     """
-    Valida CEP e busca informações de cidade usando ViaCEP.
+    Valida CEP e busca informações de cidade usando ViaCEP (com cache).
 
     Args:
         cep: CEP no formato 12345678 ou 12345-678
@@ -38,7 +80,8 @@ async def validate_cep(cep: str) -> dict:
     Returns:
         Dicionário com 'is_valid', 'city', 'city_ibge_code' e 'reason'
     """
-    address_data = await viacep_client.get_address(cep)
+    with phase("viacep"):
+        address_data = await lookup_address(cep)
 
     if address_data and address_data.get("city") and address_data.get("city_ibge_code"):
         result = {
@@ -73,7 +116,12 @@ async def validate_student_eligibility(
     Retorna:
         Dicionário com 'is_valid', 'reason' e 'validation_api_available'
     """
-    validation_data = await validation_client.validate_student(name, email, registration)
+    # Requisições repetidas com o mesmo payload aguardam a mesma chamada
+    with phase("validation"):
+        validation_data = await eligibility_flight.do(
+            (name, email, registration),
+            lambda: validation_client.validate_student(name, email, registration),
+        )
 
     if validation_data:
         result = {
@@ -90,20 +138,155 @@ async def validate_student_eligibility(
         })
         return result
     else:
-        # Se a API de validação está indisponível, aceita o estudante por padrão
-        result = {
-            "is_valid": True,
-            "reason": "Validation API unavailable - student accepted by default",
-            "validation_api_available": False,
-        }
-        # Registra log da validação de elegibilidade (API indisponível)
-        log_validation("ELEGIBILIDADE", {
-            "nome": name,
-            "email": email,
-            "valido": True,
-            "motivo": "API de validação indisponível - estudante aceito por padrão"
-        })
-        return result
+        return eligibility_unavailable(name, email)
+
+
+def eligibility_unavailable(name: str, email: str) -> dict:
+    """Resultado de fallback quando a validation-api não responde"""
+    # Se a API de validação está indisponível, aceita o estudante por padrão
+    result = {
+        "is_valid": True,
+        "reason": "Validation API unavailable - student accepted by default",
+        "validation_api_available": False,
+    }
+    # Registra log da validação de elegibilidade (API indisponível)
+    log_validation("ELEGIBILIDADE", {
+        "nome": name,
+        "email": email,
+        "valido": True,
+        "motivo": "API de validação indisponível - estudante aceito por padrão"
+    })
+    return result
+
+
+async def run_student_validations(
+    name: str, email: str, cep: str, mode: Optional[str] = None
+) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Executa a validação de CEP e a de elegibilidade de um novo estudante.
+
+    No modo 'sequential' a elegibilidade só é consultada se o CEP for válido.
+    No modo 'concurrent' as duas rodam em paralelo sob um prazo total único
+    (STUDENT_VALIDATION_DEADLINE); a primeira que falhar cancela a outra.
+    Se o prazo estourar, a elegibilidade pendente cai no fallback de API
+    indisponível e um CEP pendente gera ValidationDeadlineExceeded.
+
+    Retorna:
+        Tupla (resultado do CEP, resultado da elegibilidade); o resultado de
+        uma validação cancelada pela falha da outra é None
+    """
+    mode = mode or STUDENT_VALIDATION_MODE
+
+    if mode == "sequential":
+        cep_result = await validate_cep(cep)
+        if not cep_result["is_valid"]:
+            return cep_result, None
+        # Usa o CEP como registration, como no cadastro original
+        return cep_result, await validate_student_eligibility(name, email, cep)
+
+    cep_task = asyncio.create_task(validate_cep(cep))
+    eligibility_task = asyncio.create_task(
+        validate_student_eligibility(name, email, cep)
+    )
+    pending = {cep_task, eligibility_task}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STUDENT_VALIDATION_DEADLINE
+
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if not task.result()["is_valid"]:
+                    # Falhou: não há motivo para esperar a outra validação
+                    return (
+                        cep_task.result() if cep_task.done() else None,
+                        eligibility_task.result() if eligibility_task.done() else None,
+                    )
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if not cep_task.done() or cep_task.cancelled():
+        raise ValidationDeadlineExceeded(
+            f"Validação de CEP excedeu o prazo de {STUDENT_VALIDATION_DEADLINE}s"
+        )
+    if eligibility_task.cancelled() or not eligibility_task.done():
+        return cep_task.result(), eligibility_unavailable(name, email)
+    return cep_task.result(), eligibility_task.result()
+
+
+async def _gather_limited(calls: List[Any], concurrency: int) -> List[Any]:
+    """Executa as corrotinas com no máximo 'concurrency' simultâneas"""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def limited(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*[limited(call) for call in calls])
+
+
+async def validate_ceps(ceps: Iterable[str], concurrency: int) -> Dict[str, dict]:
+    """
+    Valida vários CEPs, consultando cada CEP distinto uma única vez.
+
+    Retorna:
+        Dicionário CEP sem hífen -> resultado de validate_cep
+    """
+    unique = sorted({cep.replace("-", "") for cep in ceps})
+    results = await _gather_limited([validate_cep(cep) for cep in unique], concurrency)
+    return dict(zip(unique, results))
+
+
+async def validate_eligibilities(
+    students: List[Tuple[str, str, str]], concurrency: int
+) -> List[dict]:
+    """
+    Valida a elegibilidade de vários estudantes (name, email, registration)
+    em paralelo, com no máximo 'concurrency' chamadas simultâneas.
+    """
+    return await _gather_limited(
+        [validate_student_eligibility(*student) for student in students], concurrency
+    )
+
+
+def expand_timetable(
+    start_date: date,
+    end_date: date,
+    weekdays: Iterable[int],
+    departure_times: Iterable[time],
+    exceptions: Iterable[date] = (),
+) -> List[datetime]:
+    """
+    Expande um quadro de horários recorrente nas partidas, em ordem.
+
+    Parâmetros:
+        start_date, end_date: período do quadro (inclusive)
+        weekdays: dias da semana ISO (1 = segunda ... 7 = domingo)
+        departure_times: horários de partida em cada dia; com fuso, cada
+            partida é convertida para UTC sem fuso (dias da semana e
+            exceções valem para a data local do horário)
+        exceptions: datas sem viagens
+
+    Retorna:
+        Lista ordenada e sem repetições de datetimes de partida, em UTC
+    """
+    weekdays = set(weekdays)
+    times = sorted(set(departure_times))
+    skipped = set(exceptions)
+    departures = []
+    day = start_date
+    while day <= end_date:
+        if day.isoweekday() in weekdays and day not in skipped:
+            departures.extend(to_naive_utc(datetime.combine(day, t)) for t in times)
+        day += timedelta(days=1)
+    # Fusos diferentes entre os horários podem cruzar a virada do dia em UTC
+    return sorted(set(departures))
 
 
 def calculate_arrival_time(
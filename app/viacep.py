@@ -1,13 +1,14 @@
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
+from app.http_pool import ServiceClient, timed_request
 
-class ViaCEPClient:
+
+class ViaCEPClient(ServiceClient):
     """Cliente para integração com ViaCEP API"""
 
     def __init__(self):
-        self.base_url = "https://viacep.com.br/ws"
-        self.timeout = 10.0
+        super().__init__("viacep", timeout=10.0, base_url="https://viacep.com.br/ws")
 
     async def get_address(self, cep: str) -> Optional[Dict[str, Any]]:
         """
@@ -19,42 +20,70 @@ class ViaCEPClient:
         Returns:
             Dict com dados do endereço ou None se falhar
         """
+        address, _ = await self.lookup(cep)
+        return address
+
+    async def lookup(self, cep: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Igual a get_address, mas informa se a resposta é definitiva.
+
+        Returns:
+            Tupla (endereço ou None, definitiva). A resposta é definitiva quando
+            a ViaCEP respondeu (CEP encontrado ou inexistente); falhas de rede,
+            timeouts e erros HTTP não são definitivos e não devem ser cacheados.
+        """
+        # Hedging e retries para respostas não definitivas (timeout, 5xx);
+        # respostas definitivas (inclusive CEP inexistente) contam como sucesso
+        result = await self._protected_call(lambda: self._fetch(cep))
+        if result is None:
+            # Circuito aberto: falha na hora, sem esperar o timeout da ViaCEP
+            print(f"ViaCEP: circuit breaker aberto, CEP {cep} não consultado")
+            return None, False
+        return result
+
+    async def _fetch(self, cep: str) -> Tuple[Optional[Dict[str, Any]], bool]:
         # Remove hífen do CEP se existir
         clean_cep = cep.replace("-", "")
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/{clean_cep}/json/")
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    # ViaCEP retorna {"erro": true} para CEP inválido
-                    if data.get("erro"):
-                        print(f"ViaCEP: Invalid CEP {cep}")
-                        return None
-
-                    return {
-                        "cep": data.get("cep"),
-                        "city": data.get("localidade"),
-                        "city_ibge_code": data.get("ibge"),
-                        "state": data.get("uf"),
-                        "neighborhood": data.get("bairro"),
-                        "street": data.get("logradouro"),
-                    }
-                else:
-                    print(f"ViaCEP returned status {response.status_code}")
-                    return None
+            client = self._get_client()
+            response = await timed_request(
+                "viacep", client.get(f"{self.base_url}/{clean_cep}/json/")
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+
+                # ViaCEP retorna {"erro": true} para CEP inválido
+                if data.get("erro"):
+                    print(f"ViaCEP: Invalid CEP {cep}")
+                    return None, True
+
+                return {
+                    "cep": data.get("cep"),
+                    "city": data.get("localidade"),
+                    "city_ibge_code": data.get("ibge"),
+                    "state": data.get("uf"),
+                    "neighborhood": data.get("bairro"),
+                    "street": data.get("logradouro"),
+                }, True
+            elif response.status_code == 400:
+                # ViaCEP responde 400 para CEP com formato inválido
+                print(f"ViaCEP: Malformed CEP {cep}")
+                return None, True
+            else:
+                print(f"ViaCEP returned status {response.status_code}")
+                return None, False
 
         except httpx.TimeoutException:
             print(f"ViaCEP timeout for CEP {cep}")
-            return None
+            return None, False
         except httpx.RequestError as e:
             print(f"ViaCEP request error: {e}")
-            return None
+            return None, False
         except Exception as e:
             print(f"Unexpected error calling ViaCEP: {e}")
-            return None
+            return None, False
 
 
 # Singleton instance
@@ -0,0 +1 @@
+# Benchmarks manuais da UniBus Core API
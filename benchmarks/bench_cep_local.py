@@ -0,0 +1,75 @@
+"""
+Benchmark da base local de CEP (app/cep_local.py).
+
+Gera faixas sintéticas (padrão: 900 mil, perto do número de faixas de
+logradouro da base dos Correios), grava o arquivo binário num diretório
+temporário e mede o tempo por consulta de CEPs aleatórios, metade dentro e
+metade fora das faixas. Não precisa de banco nem de rede.
+
+Uso:
+    python -m benchmarks.bench_cep_local --ranges 900000 --lookups 200000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.cep_local import LocalCEPResolver, build_file
+
+
+def synthetic_ranges(count: int, cities: int):
+    # Faixas de tamanho variável separadas por lacunas, cobrindo 00000-000 a 99999-999
+    step = 100_000_000 // count
+    ranges = []
+    for i in range(count):
+        start = i * step
+        end = start + random.randint(0, step - 2)
+        city_id = random.randrange(cities)
+        ranges.append((start, end, (f"Cidade {city_id}", f"{1_000_000 + city_id}", "RJ")))
+    return ranges
+
+
+def main(ranges: int, lookups: int, cities: int) -> None:
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cep_ranges.bin")
+
+        started = time.perf_counter()
+        written = build_file(synthetic_ranges(ranges, cities), path)
+        print(
+            f"{written} faixas gravadas ({os.path.getsize(path) / 1e6:.1f} MB) "
+            f"em {time.perf_counter() - started:.2f}s"
+        )
+
+        resolver = LocalCEPResolver(path)
+        started = time.perf_counter()
+        resolver.load()
+        print(f"Carga (mmap): {(time.perf_counter() - started) * 1000:.2f} ms")
+
+        ceps = [f"{random.randrange(100_000_000):08d}" for _ in range(lookups)]
+        timings = []
+        for cep in ceps:
+            started = time.perf_counter()
+            resolver.lookup(cep)
+            timings.append(time.perf_counter() - started)
+        resolver.close()
+
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99)]
+        print(f"{lookups} consultas: {resolver.hits} encontradas, {resolver.misses} fora das faixas")
+        print(
+            f"por consulta: média {statistics.mean(timings) * 1e6:.2f} µs, "
+            f"p50 {statistics.median(timings) * 1e6:.2f} µs, p99 {p99 * 1e6:.2f} µs"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ranges", type=int, default=900_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--cities", type=int, default=5_570, help="municípios distintos")
+    args = parser.parse_args()
+    main(args.ranges, args.lookups, args.cities)
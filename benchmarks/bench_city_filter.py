@@ -0,0 +1,111 @@
+"""
+Benchmark do filtro de cidade de GET /students em uma tabela grande.
+
+Insere estudantes sintéticos (padrão: 1 milhão), roda EXPLAIN ANALYZE do
+filtro antigo (ILIKE '%x%' sem índice) e dos novos caminhos indexados
+(prefixo, exato, substring via trigram e código IBGE) e remove as linhas
+no final, a menos que --keep seja informado.
+
+Requer o PostgreSQL do docker-compose (DATABASE_URL).
+
+Uso:
+    python -m benchmarks.bench_city_filter --rows 1000000
+"""
+
+import argparse
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.normalize import normalize_city
+
+CITIES = [
+    ("Rio de Janeiro", "3304557"), ("São Paulo", "3550308"),
+    ("Belo Horizonte", "3106200"), ("Niterói", "3303302"),
+    ("São Gonçalo", "3304904"), ("Duque de Caxias", "3301702"),
+    ("Nova Iguaçu", "3303500"), ("Petrópolis", "3303906"),
+    ("Campinas", "3509502"), ("Santos", "3548500"),
+    ("São José dos Campos", "3549904"), ("Curitiba", "4106902"),
+    ("Porto Alegre", "4314902"), ("Florianópolis", "4205407"),
+    ("Vitória", "3205309"), ("Salvador", "2927408"),
+    ("Recife", "2611606"), ("Fortaleza", "2304400"),
+    ("Brasília", "5300108"), ("Goiânia", "5208707"),
+]
+
+EMAIL_PREFIX = "bench-city-"
+
+QUERIES = {
+    "antigo: city ILIKE '%paulo%'":
+        "SELECT * FROM students WHERE city ILIKE '%paulo%' "
+        "ORDER BY created_at, id LIMIT 100",
+    "prefixo: city_normalized LIKE 'sao p%'":
+        "SELECT * FROM students WHERE city_normalized LIKE 'sao p%' "
+        "ORDER BY created_at, id LIMIT 100",
+    "exato: city_normalized = 'niteroi'":
+        "SELECT * FROM students WHERE city_normalized = 'niteroi' "
+        "ORDER BY created_at, id LIMIT 100",
+    "substring: city_normalized LIKE '%paulo%'":
+        "SELECT * FROM students WHERE city_normalized LIKE '%paulo%' "
+        "ORDER BY created_at, id LIMIT 100",
+    "IBGE: city_ibge_code = '3303302'":
+        "SELECT * FROM students WHERE city_ibge_code = '3303302' "
+        "ORDER BY created_at, id LIMIT 100",
+}
+
+
+def seed(conn, rows: int) -> None:
+    names = [c[0] for c in CITIES]
+    conn.execute(
+        text(
+            """
+            INSERT INTO students (name, email, cep, city, city_normalized, city_ibge_code, created_at)
+            SELECT 'Aluno ' || g,
+                   :prefix || g || '@aluno.puc.br',
+                   '01310100',
+                   (:names)[1 + g % :n],
+                   (:normalized)[1 + g % :n],
+                   (:codes)[1 + g % :n],
+                   now() - (g || ' seconds')::interval
+            FROM generate_series(1, :rows) AS g
+            """
+        ),
+        {
+            "prefix": EMAIL_PREFIX,
+            "names": names,
+            "normalized": [normalize_city(n) for n in names],
+            "codes": [c[1] for c in CITIES],
+            "n": len(CITIES),
+            "rows": rows,
+        },
+    )
+    conn.execute(text("ANALYZE students"))
+
+
+def main(rows: int, keep: bool) -> None:
+    with engine.begin() as conn:
+        print(f"Inserindo {rows} estudantes sintéticos...")
+        seed(conn, rows)
+
+    try:
+        with engine.connect() as conn:
+            for label, sql in QUERIES.items():
+                plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")).scalars().all()
+                print(f"\n== {label}")
+                for line in plan:
+                    if "Scan" in line or "Execution Time" in line:
+                        print(f"   {line.strip()}")
+    finally:
+        if not keep:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("DELETE FROM students WHERE email LIKE :pattern"),
+                    {"pattern": f"{EMAIL_PREFIX}%"},
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--keep", action="store_true", help="mantém as linhas sintéticas")
+    args = parser.parse_args()
+    main(args.rows, args.keep)
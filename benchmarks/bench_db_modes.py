@@ -0,0 +1,81 @@
+"""
+Benchmark de carga do acesso ao banco: sessão síncrona vs. AsyncSession.
+
+O modo 'sync' reproduz os handlers antigos: 'async def' chamando a Session
+síncrona (psycopg2) direto no event loop. O modo 'async' usa o engine
+asyncpg dos routers atuais. Cada requisição simulada lista 100 estudantes e
+aguarda uma chamada externa curta, como o cadastro faz com a ViaCEP.
+
+Requer o PostgreSQL do docker-compose (DATABASE_URL).
+
+Uso:
+    python -m benchmarks.bench_db_modes --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.models import Student
+
+
+async def sync_request(external_ms: float) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(select(Student).limit(100)).scalars().all()
+    finally:
+        db.close()
+    await asyncio.sleep(external_ms / 1000)
+
+
+async def async_request(external_ms: float) -> None:
+    async with AsyncSessionLocal() as db:
+        (await db.execute(select(Student).limit(100))).scalars().all()
+    await asyncio.sleep(external_ms / 1000)
+
+
+async def run(mode: str, total: int, concurrency: int, external_ms: float) -> None:
+    handler = sync_request if mode == "sync" else async_request
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(external_ms)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # Aquecimento do pool de conexões
+    await asyncio.gather(*[one() for _ in range(concurrency)])
+    latencies.clear()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"{mode:<6} {total / elapsed:8.1f} req/s  "
+        f"p50={latencies[len(latencies) // 2]:7.1f}ms  "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1]:7.1f}ms"
+    )
+
+
+async def main(total: int, concurrency: int, external_ms: float) -> None:
+    print(f"{total} requisições, concorrência {concurrency}, chamada externa {external_ms}ms\n")
+    await run("sync", total, concurrency, external_ms)
+    await run("async", total, concurrency, external_ms)
+    engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--external-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.external_ms))
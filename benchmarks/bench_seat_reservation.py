@@ -0,0 +1,119 @@
+"""
+Benchmark de carga das reservas de assento em uma única viagem disputada.
+
+Cria uma viagem com --seats assentos e dispara --requests reservas
+simultâneas (1 a 3 assentos cada) contra a aplicação, em processo. No modo
+'atomic' usa POST /trips/{id}/reserve (UPDATE condicional); no modo 'naive'
+reproduz o fluxo antigo (GET da viagem e PUT com available_seats - n).
+
+No final confere o saldo: assentos confirmados + restantes deve ser igual
+ao total inicial (sem overbooking nem decrementos perdidos). A latência
+p99 mostra se as reservas estão enfileirando atrás do lock da linha.
+
+Requer o PostgreSQL do docker-compose (DATABASE_URL) com as migrações
+aplicadas.
+
+Uso:
+    python -m benchmarks.bench_seat_reservation --requests 5000 --concurrency 200
+    python -m benchmarks.bench_seat_reservation --mode naive
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import httpx
+
+from app.db import AsyncSessionLocal, async_engine
+from app.main import app
+from app.models import Route, Trip
+
+
+async def seed(seats: int) -> int:
+    async with AsyncSessionLocal() as db:
+        route = Route(name="bench-seat-reservation", origin_city="A", destination_city="B")
+        trip = Trip(route=route, departure_time=datetime(2027, 1, 1, 8), available_seats=seats)
+        db.add(trip)
+        await db.commit()
+        return trip.id
+
+
+async def cleanup(trip_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        trip = await db.get(Trip, trip_id)
+        route = await db.get(Route, trip.route_id)
+        await db.delete(trip)
+        await db.delete(route)
+        await db.commit()
+
+
+async def reserve_atomic(client: httpx.AsyncClient, trip_id: int, seats: int) -> bool:
+    response = await client.post(f"/trips/{trip_id}/reserve", json={"seats": seats})
+    if response.status_code == 409:
+        return False
+    response.raise_for_status()
+    return True
+
+
+async def reserve_naive(client: httpx.AsyncClient, trip_id: int, seats: int) -> bool:
+    available = (await client.get(f"/trips/{trip_id}")).json()["available_seats"]
+    if available < seats:
+        return False
+    response = await client.put(f"/trips/{trip_id}", json={"available_seats": available - seats})
+    response.raise_for_status()
+    return True
+
+
+async def run(mode: str, total: int, concurrency: int, seats: int) -> None:
+    trip_id = await seed(seats)
+    reserve = reserve_atomic if mode == "atomic" else reserve_naive
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    confirmed = 0
+
+    async def one(client: httpx.AsyncClient) -> None:
+        nonlocal confirmed
+        requested = random.randint(1, 3)
+        async with semaphore:
+            started = time.perf_counter()
+            if await reserve(client, trip_id, requested):
+                confirmed += requested
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*[one(client) for _ in range(total)])
+            elapsed = time.perf_counter() - started
+
+        async with AsyncSessionLocal() as db:
+            remaining = (await db.get(Trip, trip_id)).available_seats
+    finally:
+        await cleanup(trip_id)
+        await async_engine.dispose()
+
+    latencies.sort()
+    # Confirmados além do que saiu do saldo: decrementos perdidos (overbooking)
+    oversold = confirmed - (seats - remaining)
+    print(
+        f"{mode:>6}: {total / elapsed:8.1f} req/s | "
+        f"p50={latencies[len(latencies) // 2]:.1f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}ms"
+    )
+    print(
+        f"        assentos: {seats} iniciais, {confirmed} confirmados, {remaining} restantes"
+        f" -> {'OK' if oversold == 0 else f'{oversold} assento(s) vendido(s) a mais'}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["atomic", "naive"], default="atomic")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seats", type=int, default=4000)
+    args = parser.parse_args()
+    asyncio.run(run(args.mode, args.requests, args.concurrency, args.seats))
@@ -0,0 +1,166 @@
+"""
+Microbenchmark da serialização das listagens (GET /students e GET /trips).
+
+Compara, por página de --limit linhas, o caminho anterior (SELECT de
+objetos ORM, model_validate por item, revalidação do response_model pelo
+FastAPI e json.dumps) com o caminho rápido atual (SELECT só das colunas do
+schema, dicts e orjson, em app/serialization.py). Insere linhas sintéticas
+e as remove no final, a menos que --keep seja informado.
+
+Usa o banco de DATABASE_URL (PostgreSQL do docker-compose).
+
+Uso:
+    python -m benchmarks.bench_serialization --limit 100 --iterations 500
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List, Union
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.models import Route, Student, Trip
+from app.schemas import StudentResponse, TripResponse, TripWithRouteResponse
+from app.serialization import rows_to_dicts, schema_columns
+
+EMAIL_PREFIX = "bench-serialization-"
+ROUTE_NAME = "bench-serialization"
+
+
+def _render(content) -> bytes:
+    # Mesmo encoder do JSONResponse padrão do FastAPI
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def seed(session: Session, rows: int) -> int:
+    started = datetime(2026, 1, 1)
+    session.add_all(
+        Student(
+            name=f"Estudante {i}",
+            email=f"{EMAIL_PREFIX}{i}@uni.edu.br",
+            cep="01310-100",
+            city="São Paulo",
+            city_ibge_code="3550308",
+            created_at=started + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    )
+    route = Route(name=ROUTE_NAME, origin_city="Rio de Janeiro", destination_city="Niterói")
+    session.add(route)
+    session.flush()
+    session.add_all(
+        Trip(
+            route_id=route.id,
+            bus_plate=f"BEN{i % 10000:04d}",
+            departure_time=started + timedelta(minutes=15 * i),
+            arrival_time=started + timedelta(minutes=15 * i + 40),
+            available_seats=40,
+        )
+        for i in range(rows)
+    )
+    session.commit()
+    return route.id
+
+
+def cleanup(session: Session) -> None:
+    route_ids = select(Route.id).where(Route.name == ROUTE_NAME).scalar_subquery()
+    session.execute(delete(Trip).where(Trip.route_id.in_(route_ids)))
+    session.execute(delete(Route).where(Route.name == ROUTE_NAME))
+    session.execute(delete(Student).where(Student.email.like(f"{EMAIL_PREFIX}%")))
+    session.commit()
+
+
+def students_orm(session: Session, limit: int) -> bytes:
+    students = session.scalars(
+        select(Student)
+        .where(Student.email.like(f"{EMAIL_PREFIX}%"))
+        .order_by(Student.created_at, Student.id)
+        .limit(limit)
+    ).all()
+    adapter = TypeAdapter(List[StudentResponse])
+    return _render(adapter.dump_python(adapter.validate_python(students), mode="json"))
+
+
+def students_fast(session: Session, limit: int) -> bytes:
+    result = session.execute(
+        select(*schema_columns(Student, StudentResponse))
+        .where(Student.email.like(f"{EMAIL_PREFIX}%"))
+        .order_by(Student.created_at, Student.id)
+        .limit(limit)
+    )
+    return orjson.dumps(rows_to_dicts(result))
+
+
+def trips_orm(session: Session, limit: int, route_id: int) -> bytes:
+    trips = session.scalars(
+        select(Trip).where(Trip.route_id == route_id).order_by(Trip.id).limit(limit)
+    ).all()
+    # O endpoint validava cada item e o FastAPI revalidava a lista (Union)
+    items = [TripResponse.model_validate(trip) for trip in trips]
+    adapter = TypeAdapter(List[Union[TripWithRouteResponse, TripResponse]])
+    return _render(adapter.dump_python(adapter.validate_python(items), mode="json"))
+
+
+def trips_fast(session: Session, limit: int, route_id: int) -> bytes:
+    result = session.execute(
+        select(*schema_columns(Trip, TripResponse))
+        .where(Trip.route_id == route_id)
+        .order_by(Trip.id)
+        .limit(limit)
+    )
+    return orjson.dumps(rows_to_dicts(result))
+
+
+def measure(label: str, fn, iterations: int) -> float:
+    # Sessão nova por página, como nas requisições (identity map vazio)
+    with Session(engine) as session:
+        fn(session)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with Session(engine) as session:
+            fn(session)
+    per_page = (time.perf_counter() - started) / iterations
+    print(f"   {label:<28} {per_page * 1000:8.3f} ms/página")
+    return per_page
+
+
+def main(rows: int, limit: int, iterations: int, keep: bool) -> None:
+    with Session(engine) as session:
+        print(f"Inserindo {rows} estudantes e {rows} viagens sintéticos...")
+        route_id = seed(session, rows)
+
+    try:
+        with Session(engine) as session:
+            if json.loads(students_orm(session, limit)) != json.loads(students_fast(session, limit)):
+                raise SystemExit("Os dois caminhos geraram JSON diferente para estudantes")
+            if json.loads(trips_orm(session, limit, route_id)) != json.loads(trips_fast(session, limit, route_id)):
+                raise SystemExit("Os dois caminhos geraram JSON diferente para viagens")
+
+        for name, orm_fn, fast_fn in (
+            ("GET /students", students_orm, students_fast),
+            ("GET /trips", lambda s, n: trips_orm(s, n, route_id), lambda s, n: trips_fast(s, n, route_id)),
+        ):
+            print(f"\n== {name} (limit={limit}, {iterations} páginas)")
+            before = measure("ORM + response_model", lambda s: orm_fn(s, limit), iterations)
+            after = measure("colunas + orjson", lambda s: fast_fn(s, limit), iterations)
+            print(f"   {'ganho':<28} {before / after:8.2f}x")
+    finally:
+        if not keep:
+            with Session(engine) as session:
+                cleanup(session)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="mantém as linhas sintéticas")
+    args = parser.parse_args()
+    main(args.rows, args.limit, args.iterations, args.keep)
@@ -0,0 +1,68 @@
+"""
+Benchmark das validações do cadastro de estudante: modo sequencial vs. concorrente.
+
+As chamadas externas (ViaCEP e validation-api) são substituídas por esperas
+com a latência informada, então o resultado mede só a orquestração.
+
+Uso:
+    python -m benchmarks.bench_student_validation --viacep-ms 120 --validation-ms 180
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app import services
+from app.audit_log import audit_log
+from app.cep_cache import cep_cache
+
+
+async def measure(mode: str, runs: int) -> list:
+    timings = []
+    for i in range(runs):
+        started = time.perf_counter()
+        # CEPs e emails distintos para não acertar cache nem single-flight
+        await services.run_student_validations(
+            f"Aluno {i}", f"aluno{i}-{mode}@aluno.puc.br", f"{i:08d}", mode=mode
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(mode: str, timings: list) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{mode:<11} média={statistics.mean(timings):7.1f}ms "
+        f"p50={statistics.median(timings):7.1f}ms p95={p95:7.1f}ms"
+    )
+
+
+async def main(viacep_ms: float, validation_ms: float, runs: int) -> None:
+    async def fake_lookup(cep):
+        await asyncio.sleep(viacep_ms / 1000)
+        return {"city": "Rio de Janeiro", "city_ibge_code": "3304557", "state": "RJ"}, True
+
+    async def fake_validate(name, email, registration):
+        await asyncio.sleep(validation_ms / 1000)
+        return {"is_valid": True, "reason": "ok"}
+
+    services.viacep_client.lookup = fake_lookup
+    services.validation_client.validate_student = fake_validate
+    cep_cache.persistent_enabled = False
+    audit_log.path = "/dev/null"
+
+    print(f"ViaCEP={viacep_ms}ms validation-api={validation_ms}ms, {runs} cadastros por modo\n")
+    for mode in ("sequential", "concurrent"):
+        cep_cache.memory.clear()
+        report(mode, await measure(mode, runs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--viacep-ms", type=float, default=120.0)
+    parser.add_argument("--validation-ms", type=float, default=180.0)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.viacep_ms, args.validation_ms, args.runs))
@@ -0,0 +1,185 @@
+"""
+Benchmark da busca de viagens (GET /trips/search) em uma tabela grande.
+
+Cria rotas sintéticas entre as cidades abaixo e insere viagens (padrão:
+10 milhões) espalhadas por um ano. Em seguida mede a latência (p50/p95/p99)
+de cada cenário de busca, compara com a meta informada em --target-ms e
+mostra os índices usados (EXPLAIN ANALYZE). As linhas sintéticas são
+removidas no final, a menos que --keep seja informado.
+
+Requer o PostgreSQL do docker-compose (DATABASE_URL) com as migrações
+aplicadas.
+
+Uso:
+    python -m benchmarks.bench_trip_search --trips 10000000 --target-ms 50
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.normalize import normalize_city
+
+CITIES = [
+    "Rio de Janeiro", "São Paulo", "Belo Horizonte", "Niterói", "Campinas",
+    "Santos", "Curitiba", "Porto Alegre", "Florianópolis", "Vitória",
+    "Salvador", "Recife", "Fortaleza", "Brasília", "Goiânia",
+]
+
+ROUTE_PREFIX = "bench-trip-"
+
+# Uma janela de 3 dias dentro do período das viagens sintéticas
+WINDOW_START = datetime(2027, 3, 1)
+WINDOW_END = WINDOW_START + timedelta(days=3)
+
+SEARCH_SQL = """
+    SELECT trips.* FROM trips
+    JOIN routes ON routes.id = trips.route_id
+    WHERE routes.origin_city_normalized = :origin
+      AND routes.destination_city_normalized = :destination
+      AND trips.departure_time >= :start AND trips.departure_time < :end
+      AND trips.available_seats >= 1
+    ORDER BY trips.departure_time, trips.id
+    LIMIT 100
+"""
+
+ORIGIN_SQL = """
+    SELECT trips.* FROM trips
+    JOIN routes ON routes.id = trips.route_id
+    WHERE routes.origin_city_normalized = :origin
+      AND trips.departure_time >= :start AND trips.departure_time < :end
+      AND trips.available_seats >= 1
+    ORDER BY trips.departure_time, trips.id
+    LIMIT 100
+"""
+
+WINDOW_SQL = """
+    SELECT trips.* FROM trips
+    WHERE trips.departure_time >= :start AND trips.departure_time < :end
+      AND trips.available_seats >= 1
+    ORDER BY trips.departure_time, trips.id
+    LIMIT 100
+"""
+
+SCENARIOS = {
+    "origem + destino + janela": (SEARCH_SQL, {
+        "origin": normalize_city("São Paulo"),
+        "destination": normalize_city("Rio de Janeiro"),
+    }),
+    "só origem + janela": (ORIGIN_SQL, {"origin": normalize_city("Niterói")}),
+    "só janela": (WINDOW_SQL, {}),
+}
+
+
+def seed(conn, trips: int) -> None:
+    pairs = [(o, d) for o in CITIES for d in CITIES if o != d]
+    conn.execute(
+        text(
+            """
+            INSERT INTO routes (name, origin_city, destination_city,
+                                origin_city_normalized, destination_city_normalized,
+                                estimated_duration_min)
+            VALUES (:name, :origin, :destination, :origin_n, :destination_n, 360)
+            """
+        ),
+        [
+            {
+                "name": f"{ROUTE_PREFIX}{i}",
+                "origin": o,
+                "destination": d,
+                "origin_n": normalize_city(o),
+                "destination_n": normalize_city(d),
+            }
+            for i, (o, d) in enumerate(pairs)
+        ],
+    )
+    route_ids = conn.execute(
+        text("SELECT id FROM routes WHERE name LIKE :pattern ORDER BY id"),
+        {"pattern": f"{ROUTE_PREFIX}%"},
+    ).scalars().all()
+
+    # Partidas a cada ~3 segundos ao longo de um ano, rotas e assentos em rodízio
+    conn.execute(
+        text(
+            """
+            INSERT INTO trips (route_id, bus_plate, departure_time, arrival_time, available_seats)
+            SELECT (:route_ids)[1 + g % :n],
+                   'BEN' || lpad((g % 10000)::text, 4, '0'),
+                   timestamp '2027-01-01' + (g * (31536000.0 / :trips)) * interval '1 second',
+                   timestamp '2027-01-01' + (g * (31536000.0 / :trips)) * interval '1 second'
+                       + interval '6 hours',
+                   g % 45
+            FROM generate_series(1, :trips) AS g
+            """
+        ),
+        {"route_ids": route_ids, "n": len(route_ids), "trips": trips},
+    )
+    conn.execute(text("ANALYZE routes"))
+    conn.execute(text("ANALYZE trips"))
+
+
+def measure(conn, sql: str, params: dict, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main(trips: int, runs: int, target_ms: float, keep: bool) -> None:
+    with engine.begin() as conn:
+        print(f"Inserindo {trips} viagens sintéticas...")
+        seed(conn, trips)
+
+    window = {"start": WINDOW_START, "end": WINDOW_END}
+    failed = False
+    try:
+        with engine.connect() as conn:
+            for label, (sql, params) in SCENARIOS.items():
+                params = {**params, **window}
+                timings = measure(conn, sql, params, runs)
+                p95 = percentile(timings, 95)
+                ok = p95 <= target_ms
+                failed |= not ok
+                print(f"\n== {label}")
+                print(
+                    f"   p50={statistics.median(timings):.2f}ms "
+                    f"p95={p95:.2f}ms p99={percentile(timings, 99):.2f}ms "
+                    f"[{'OK' if ok else 'ACIMA DA META'} {target_ms:.0f}ms]"
+                )
+                plan = conn.execute(
+                    text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params
+                ).scalars().all()
+                for line in plan:
+                    if "Scan" in line or "Execution Time" in line:
+                        print(f"   {line.strip()}")
+    finally:
+        if not keep:
+            with engine.begin() as conn:
+                bench_routes = "SELECT id FROM routes WHERE name LIKE :pattern"
+                pattern = {"pattern": f"{ROUTE_PREFIX}%"}
+                conn.execute(text(f"DELETE FROM trips WHERE route_id IN ({bench_routes})"), pattern)
+                conn.execute(text("DELETE FROM routes WHERE name LIKE :pattern"), pattern)
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trips", type=int, default=10_000_000)
+    parser.add_argument("--runs", type=int, default=200, help="execuções por cenário")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="meta de p95 (ms)")
+    parser.add_argument("--keep", action="store_true", help="mantém as linhas sintéticas")
+    args = parser.parse_args()
+    main(args.trips, args.runs, args.target_ms, args.keep)
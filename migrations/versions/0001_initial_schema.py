@@ -0,0 +1,58 @@
+"""Esquema inicial: students, routes e trips
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "students",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("cep", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        # Nome da cidade normalizado para busca (índices e backfill na 0003)
+        sa.Column("city_normalized", sa.String(), nullable=True),
+        sa.Column("city_ibge_code", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_students_id", "students", ["id"])
+    op.create_index("ix_students_email", "students", ["email"], unique=True)
+
+    op.create_table(
+        "routes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("origin_city", sa.String(), nullable=False),
+        sa.Column("destination_city", sa.String(), nullable=False),
+        sa.Column("distance_km", sa.Float(), nullable=True),
+        sa.Column("estimated_duration_min", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_routes_id", "routes", ["id"])
+
+    op.create_table(
+        "trips",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("route_id", sa.Integer(), sa.ForeignKey("routes.id"), nullable=False),
+        sa.Column("bus_plate", sa.String(), nullable=True),
+        sa.Column("departure_time", sa.DateTime(), nullable=False),
+        sa.Column("arrival_time", sa.DateTime(), nullable=True),
+        sa.Column("available_seats", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_trips_id", "trips", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("trips")
+    op.drop_table("routes")
+    op.drop_table("students")
@@ -0,0 +1,32 @@
+"""Tabela cep_cache (segundo nível do cache de CEP)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Bancos criados com create_all já podem ter a tabela
+    if sa.inspect(op.get_bind()).has_table("cep_cache"):
+        return
+    op.create_table(
+        "cep_cache",
+        sa.Column("cep", sa.String(8), primary_key=True),
+        sa.Column("is_valid", sa.Boolean(), nullable=False),
+        sa.Column("city", sa.String(), nullable=True),
+        sa.Column("city_ibge_code", sa.String(), nullable=True),
+        sa.Column("state", sa.String(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cep_cache")
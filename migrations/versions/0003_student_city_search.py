@@ -0,0 +1,66 @@
+"""Busca de estudantes por cidade: coluna normalizada e índices
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.normalize import normalize_city
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Bancos novos já têm a coluna (0001); os criados com create_all antes
+    # dela, marcados na 0001 pelo startup, ainda não
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("students")}
+    if "city_normalized" not in columns:
+        op.add_column("students", sa.Column("city_normalized", sa.String(), nullable=True))
+
+    # Backfill por cidade distinta: poucas cidades, muitas linhas
+    cities = bind.execute(sa.text(
+        "SELECT DISTINCT city FROM students WHERE city_normalized IS NULL"
+    )).scalars().all()
+    for city in cities:
+        bind.execute(
+            sa.text(
+                "UPDATE students SET city_normalized = :normalized "
+                "WHERE city = :city AND city_normalized IS NULL"
+            ),
+            {"normalized": normalize_city(city), "city": city},
+        )
+
+    op.create_index(
+        "ix_students_city_normalized", "students", ["city_normalized"],
+        postgresql_ops={"city_normalized": "text_pattern_ops"},
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_students_city_ibge_code", "students", ["city_ibge_code"],
+        if_not_exists=True,
+    )
+
+    # Índice trigram para busca por substring; opcional, depende de pg_trgm
+    if bind.dialect.name == "postgresql":
+        try:
+            with bind.begin_nested():
+                bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                bind.execute(sa.text(
+                    "CREATE INDEX IF NOT EXISTS ix_students_city_normalized_trgm "
+                    "ON students USING gin (city_normalized gin_trgm_ops)"
+                ))
+        except sa.exc.DBAPIError as e:
+            print(f"Índice trigram de cidade indisponível: {e}")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_students_city_normalized_trgm")
+    op.drop_index("ix_students_city_ibge_code", table_name="students")
+    op.drop_index("ix_students_city_normalized", table_name="students")
+    # A coluna pertence ao esquema inicial (0001) e fica
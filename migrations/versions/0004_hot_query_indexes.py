@@ -0,0 +1,37 @@
+"""Índices para as consultas mais frequentes dos routers
+
+- students (created_at, id): filtro created_at e paginação de GET /students
+- trips (route_id, departure_time): FK usada ao carregar/deletar viagens de uma rota
+- trips (departure_time): ordenação e filtros por horário de partida
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_students_created_at_id", "students", ["created_at", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_trips_route_id_departure_time", "trips", ["route_id", "departure_time"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_trips_departure_time", "trips", ["departure_time"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_trips_departure_time", table_name="trips")
+    op.drop_index("ix_trips_route_id_departure_time", table_name="trips")
+    op.drop_index("ix_students_created_at_id", table_name="students")
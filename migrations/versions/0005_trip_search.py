@@ -0,0 +1,53 @@
+"""Busca de viagens por origem, destino e janela de partida
+
+- routes.origin_city_normalized / destination_city_normalized, com backfill
+- routes (origin_city_normalized, destination_city_normalized): rotas de um par de cidades
+- as viagens dessas rotas saem de trips (route_id, departure_time), criado na 0004
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.normalize import normalize_city
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("routes")}
+    for column in ("origin_city_normalized", "destination_city_normalized"):
+        if column not in columns:
+            op.add_column("routes", sa.Column(column, sa.String(), nullable=True))
+
+    # Backfill por cidade distinta, como em students.city_normalized
+    for column in ("origin_city", "destination_city"):
+        cities = bind.execute(sa.text(
+            f"SELECT DISTINCT {column} FROM routes WHERE {column}_normalized IS NULL"
+        )).scalars().all()
+        for city in cities:
+            bind.execute(
+                sa.text(
+                    f"UPDATE routes SET {column}_normalized = :normalized "
+                    f"WHERE {column} = :city AND {column}_normalized IS NULL"
+                ),
+                {"normalized": normalize_city(city), "city": city},
+            )
+
+    op.create_index(
+        "ix_routes_origin_destination", "routes",
+        ["origin_city_normalized", "destination_city_normalized"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_routes_origin_destination", table_name="routes")
+    op.drop_column("routes", "destination_city_normalized")
+    op.drop_column("routes", "origin_city_normalized")
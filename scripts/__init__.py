@@ -0,0 +1 @@
+# Scripts operacionais da UniBus Core API
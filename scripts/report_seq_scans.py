@@ -0,0 +1,141 @@
+"""
+Relatório de sequential scans nas consultas usadas pelos routers.
+
+Para cada formato de consulta dos endpoints, roda EXPLAIN e aponta as
+tabelas lidas com Seq Scan. Por padrão desliga enable_seqscan na sessão,
+assim o relatório mostra se existe um índice utilizável mesmo em bancos
+pequenos (onde o planner prefere seq scan de qualquer forma); use
+--natural para ver a escolha real do planner. No final lista os contadores
+seq_scan/idx_scan de pg_stat_user_tables.
+
+Requer PostgreSQL (DATABASE_URL).
+
+Uso:
+    python -m scripts.report_seq_scans [--natural]
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.orm import joinedload
+
+from app.db import engine
+from app.models import Route, Student, Trip
+from app.schemas import RouteResponse, StudentResponse, TripResponse
+from app.serialization import schema_columns
+
+SAMPLE_DATE = datetime(2025, 1, 1)
+
+
+def query_shapes():
+    """Consultas equivalentes às emitidas por cada endpoint"""
+    # As listagens selecionam só as colunas do schema (app/serialization.py)
+    trip_columns = schema_columns(Trip, TripResponse)
+    trip_with_route_columns = trip_columns + schema_columns(Route, RouteResponse, relation="route")
+    students = (
+        select(*schema_columns(Student, StudentResponse))
+        .order_by(Student.created_at, Student.id)
+        .limit(100)
+    )
+    trip_search = (
+        select(*trip_columns)
+        .where(
+            Trip.departure_time >= SAMPLE_DATE,
+            Trip.departure_time < SAMPLE_DATE + timedelta(days=3),
+            Trip.available_seats >= 1,
+        )
+        .order_by(Trip.departure_time, Trip.id)
+        .limit(100)
+    )
+    return {
+        "GET /students/": students,
+        "GET /students/?cursor=...": students.where(
+            tuple_(Student.created_at, Student.id) > tuple_(SAMPLE_DATE, 1)
+        ),
+        "GET /students/?city=paulo": students.where(
+            Student.city_normalized.like("%paulo%", escape="\\")
+        ),
+        "GET /students/?city=sao&city_match=prefix": students.where(
+            Student.city_normalized.like("sao%", escape="\\")
+        ),
+        "GET /students/?city=niteroi&city_match=exact": students.where(
+            Student.city_normalized == "niteroi"
+        ),
+        "GET /students/?city_ibge_code=3303302": students.where(
+            Student.city_ibge_code == "3303302"
+        ),
+        "GET /students/?created_at=2025-01-01": students.where(
+            Student.created_at >= SAMPLE_DATE,
+            Student.created_at < SAMPLE_DATE + timedelta(days=1),
+        ),
+        "GET /students/{id}": select(Student).where(Student.id == 1),
+        "GET /routes/": select(*schema_columns(Route, RouteResponse)).order_by(Route.id).limit(100),
+        "GET /routes/{id}": select(Route).where(Route.id == 1),
+        "GET /trips/": select(*trip_columns).order_by(Trip.id).limit(100),
+        "GET /trips/{id}": select(Trip).options(joinedload(Trip.route)).where(Trip.id == 1),
+        "GET /trips/?include=route": select(*trip_with_route_columns).join(Trip.route)
+        .order_by(Trip.id).limit(100),
+        "GET /routes/{id}/trips": select(*trip_columns).where(Trip.route_id == 1)
+        .order_by(Trip.departure_time, Trip.id).limit(100),
+        "GET /trips/search?origin_city=...&destination_city=...": trip_search.join(Trip.route).where(
+            Route.origin_city_normalized == "sao paulo",
+            Route.destination_city_normalized == "rio de janeiro",
+        ),
+        "GET /trips/search?departure_from=...": trip_search,
+        "DELETE /routes/{id} (cascade trips)": select(Trip).where(Trip.route_id == 1),
+    }
+
+
+def seq_scanned_tables(plan: dict) -> list:
+    """Percorre a árvore do EXPLAIN (FORMAT JSON) coletando os Seq Scans"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scanned_tables(child))
+    return found
+
+
+def main(natural: bool) -> int:
+    offenders = 0
+    with engine.connect() as conn:
+        if not natural:
+            conn.execute(text("SET enable_seqscan = off"))
+
+        print(f"{'Endpoint':<50} Resultado")
+        print("-" * 80)
+        for label, statement in query_shapes().items():
+            compiled = statement.compile(dialect=conn.dialect)
+            raw = conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+            ).scalar()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            tables = seq_scanned_tables(plan)
+            if tables:
+                offenders += 1
+                print(f"{label:<50} SEQ SCAN em {', '.join(sorted(set(tables)))}")
+            else:
+                print(f"{label:<50} ok (índice)")
+
+        print("\npg_stat_user_tables")
+        print(f"{'tabela':<16} {'seq_scan':>10} {'seq_tup_read':>14} {'idx_scan':>10}")
+        rows = conn.execute(text(
+            "SELECT relname, seq_scan, seq_tup_read, coalesce(idx_scan, 0) "
+            "FROM pg_stat_user_tables ORDER BY seq_tup_read DESC"
+        ))
+        for relname, seq_scan, seq_tup_read, idx_scan in rows:
+            print(f"{relname:<16} {seq_scan:>10} {seq_tup_read:>14} {idx_scan:>10}")
+
+    return 1 if offenders else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--natural", action="store_true",
+        help="não desliga enable_seqscan (mostra a escolha real do planner)",
+    )
+    args = parser.parse_args()
+    raise SystemExit(main(args.natural))
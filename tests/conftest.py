@@ -0,0 +1,70 @@
+"""
+Fixtures dos testes automatizados.
+
+Os testes rodam num SQLite temporário (aiosqlite), com as migrações do
+Alembic aplicadas no startup da aplicação, e sem chamar a ViaCEP nem a
+Validation API: os dois clientes externos são substituídos por respostas
+fixas. O cache de respostas GET é desligado para que cada requisição
+chegue ao banco.
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="unibus-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/unibus.sqlite"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_DIR}/unibus.sqlite"
+os.environ["AUDIT_LOG_FILE"] = os.path.join(_DB_DIR, "validations.log")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["CEP_LOCAL_FILE"] = os.path.join(_DB_DIR, "cep_ranges.bin")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+from app import services
+from app.db import SessionLocal, async_engine
+from app.main import app
+from app.models import CepCache, Route, Student, Trip
+
+
+async def _fake_cep_lookup(cep: str):
+    return {"city": "São Paulo", "city_ibge_code": "3550308", "state": "SP"}, True
+
+
+async def _fake_validate_student(name: str, email: str, registration: str):
+    return {"is_valid": True, "reason": "Estudante elegível"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    patch = pytest.MonkeyPatch()
+    patch.setattr(services.viacep_client, "lookup", _fake_cep_lookup)
+    patch.setattr(services.validation_client, "validate_student", _fake_validate_student)
+    with TestClient(app) as test_client:
+        yield test_client
+    patch.undo()
+
+
+@pytest.fixture
+def db(client):
+    """Sessão síncrona para montar os dados; as tabelas são esvaziadas no fim"""
+    with SessionLocal() as session:
+        yield session
+        session.rollback()
+        for model in (Trip, Route, Student, CepCache):
+            session.execute(delete(model))
+        session.commit()
+
+
+@pytest.fixture
+def statements():
+    """Comandos SQL enviados pelo engine assíncrono (o dos routers)"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
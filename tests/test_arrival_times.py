@@ -0,0 +1,53 @@
+"""
+Recálculo do arrival_time no banco quando a duração da rota muda: só as
+viagens futuras (em UTC) são alteradas.
+"""
+
+from datetime import datetime, timedelta
+
+from app.models import Route, Trip
+
+
+def _seed(db):
+    route = Route(
+        name="Rota", origin_city="Rio de Janeiro", destination_city="Niterói",
+        estimated_duration_min=30,
+    )
+    db.add(route)
+    db.flush()
+    past = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    future = datetime(2030, 5, 1, 8, 0, 0, 250000)
+    for departure in (past, future):
+        db.add(Trip(
+            route_id=route.id, departure_time=departure,
+            arrival_time=departure + timedelta(minutes=30), available_seats=40,
+        ))
+    db.commit()
+    return route.id, past, future
+
+
+def test_duration_change_updates_future_trips(client, db):
+    route_id, past, future = _seed(db)
+
+    db.query(Route).filter(Route.id == route_id).update({"estimated_duration_min": 45})
+    db.commit()
+    preview = client.post(f"/routes/{route_id}/recompute-arrivals", params={"dry_run": "true"})
+    assert preview.json()["trips"] == 1
+
+    response = client.post(f"/routes/{route_id}/recompute-arrivals")
+
+    assert response.status_code == 200
+    assert response.json()["trips"] == 1
+    db.expire_all()
+    arrivals = dict(db.query(Trip.departure_time, Trip.arrival_time).filter(Trip.route_id == route_id))
+    assert arrivals[past] == past + timedelta(minutes=30)
+    assert arrivals[future] == future + timedelta(minutes=45)
+
+
+def test_recompute_is_idempotent(client, db):
+    route_id, _, _ = _seed(db)
+
+    response = client.post(f"/routes/{route_id}/recompute-arrivals", params={"dry_run": "true"})
+
+    assert response.status_code == 200
+    assert response.json()["trips"] == 0
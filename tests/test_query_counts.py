@@ -0,0 +1,77 @@
+"""
+Quantidade de comandos SQL por listagem.
+
+As listagens com a rota embutida e a de estudantes devem rodar um número
+fixo de comandos, independente de quantas linhas a página traz (sem N+1).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Route, Student, Trip
+
+
+def _seed_trips(db, rows: int, routes: int) -> int:
+    """Cria 'rows' viagens distribuídas entre 'routes' rotas; retorna a primeira rota"""
+    created = [
+        Route(name=f"Rota {i}", origin_city="Rio de Janeiro", destination_city="Niterói")
+        for i in range(routes)
+    ]
+    db.add_all(created)
+    db.flush()
+    started = datetime(2030, 1, 1, 8)
+    db.add_all(
+        Trip(
+            route_id=created[i % routes].id,
+            departure_time=started + timedelta(hours=i),
+            available_seats=40,
+        )
+        for i in range(rows)
+    )
+    db.commit()
+    return created[0].id
+
+
+def _seed_students(db, rows: int) -> None:
+    db.add_all(
+        Student(
+            name=f"Estudante {i}",
+            email=f"estudante{i}@aluno.puc.br",
+            cep="01310-100",
+            city="São Paulo",
+            city_normalized="sao paulo",
+            city_ibge_code="3550308",
+        )
+        for i in range(rows)
+    )
+    db.commit()
+
+
+def _count(client, statements, url: str, rows: int) -> int:
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()) == rows
+    return len(statements)
+
+
+@pytest.mark.parametrize("rows", [1, 20])
+def test_trips_with_route_single_statement(client, db, statements, rows):
+    # Uma rota por viagem: um lazy load por linha apareceria aqui
+    _seed_trips(db, rows, routes=rows)
+    assert _count(client, statements, "/trips/?include=route&limit=100", rows) == 1
+
+
+@pytest.mark.parametrize("rows", [1, 20])
+def test_route_trips_fixed_statements(client, db, statements, rows):
+    route_id = _seed_trips(db, rows, routes=1)
+    # Um SELECT da rota (404 se não existe) e um das viagens
+    assert _count(client, statements, f"/routes/{route_id}/trips?limit=100", rows) == 2
+
+
+@pytest.mark.parametrize("rows", [1, 20])
+def test_students_list_single_statement(client, db, statements, rows):
+    _seed_students(db, rows)
+    assert _count(client, statements, "/students/?limit=100", rows) == 1
+    assert _count(client, statements, "/students/?city=paulo&limit=100", rows) == 1
@@ -0,0 +1,54 @@
+"""
+Distância e duração das rotas: reestimadas só quando origem ou destino
+mudam, sem apagar os valores atuais quando não há estimativa.
+"""
+
+from app.models import Route
+
+
+def _seed_route(db) -> int:
+    route = Route(
+        name="Rota", origin_city="Rio de Janeiro", destination_city="Niterói",
+        distance_km=15.0, estimated_duration_min=40,
+    )
+    db.add(route)
+    db.commit()
+    return route.id
+
+
+def test_rename_keeps_estimates(client, db):
+    route_id = _seed_route(db)
+
+    response = client.put(f"/routes/{route_id}", json={
+        "name": "Rota nova", "origin_city": "Rio de Janeiro", "destination_city": "Niterói",
+    })
+
+    assert response.status_code == 200
+    assert response.json()["distance_km"] == 15.0
+    assert response.json()["estimated_duration_min"] == 40
+
+
+def test_unknown_city_keeps_estimates(client, db):
+    route_id = _seed_route(db)
+
+    response = client.put(f"/routes/{route_id}", json={
+        "name": "Rota", "origin_city": "Cidade Inexistente", "destination_city": "Niterói",
+    })
+
+    assert response.status_code == 200
+    assert response.json()["origin_city"] == "Cidade Inexistente"
+    assert response.json()["distance_km"] == 15.0
+    assert response.json()["estimated_duration_min"] == 40
+
+
+
+def test_new_cities_are_estimated(client, db):
+    route_id = _seed_route(db)
+
+    response = client.put(f"/routes/{route_id}", json={
+        "name": "Rota", "origin_city": "São Paulo", "destination_city": "Campinas",
+    })
+
+    assert response.status_code == 200
+    assert response.json()["distance_km"] == 110.4
+    assert response.json()["estimated_duration_min"] == 114
@@ -0,0 +1,72 @@
+"""
+Reservas de assentos concorrentes: nenhuma viagem fica com saldo negativo
+e cada pedido sem assento suficiente recebe 409.
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+import httpx
+
+from app.main import app
+from app.models import Route, Trip
+
+
+def _seed_trip(db, seats: int) -> int:
+    route = Route(name="Rota", origin_city="Rio de Janeiro", destination_city="Niterói")
+    db.add(route)
+    db.flush()
+    trip = Trip(route_id=route.id, departure_time=datetime(2030, 1, 1, 8), available_seats=seats)
+    db.add(trip)
+    db.commit()
+    return trip.id
+
+
+def _post_concurrently(client, requests):
+    """Envia os POSTs ao mesmo tempo, no event loop da aplicação"""
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.post(url, json=body) for url, body in requests))
+
+    return client.portal.call(send)
+
+
+def test_concurrent_reservations_never_overbook(client, db):
+    trip_id = _seed_trip(db, seats=10)
+
+    responses = _post_concurrently(
+        client, [(f"/trips/{trip_id}/reserve", {"seats": 1})] * 30
+    )
+
+    statuses = Counter(response.status_code for response in responses)
+    assert statuses == {200: 10, 409: 20}
+    remaining = sorted(r.json()["available_seats"] for r in responses if r.status_code == 200)
+    assert remaining == list(range(10))
+    assert client.get(f"/trips/{trip_id}").json()["available_seats"] == 0
+
+
+def test_conflict_reports_available_seats(client, db):
+    trip_id = _seed_trip(db, seats=2)
+
+    response = client.post(f"/trips/{trip_id}/reserve", json={"seats": 3})
+
+    assert response.status_code == 409
+    assert "2 assento(s)" in response.json()["detail"]
+    assert client.get(f"/trips/{trip_id}").json()["available_seats"] == 2
+
+
+def test_concurrent_batches_are_all_or_nothing(client, db):
+    first = _seed_trip(db, seats=5)
+    second = _seed_trip(db, seats=3)
+    batch = {"items": [{"trip_id": second, "seats": 1}, {"trip_id": first, "seats": 1}]}
+
+    responses = _post_concurrently(client, [("/trips/reserve", batch)] * 8)
+
+    statuses = Counter(response.status_code for response in responses)
+    # O segundo trecho esgota com 3 lotes; os demais falham sem tocar no primeiro
+    assert statuses == {200: 3, 409: 5}
+    assert client.get(f"/trips/{first}").json()["available_seats"] == 2
+    assert client.get(f"/trips/{second}").json()["available_seats"] == 0
@@ -0,0 +1,58 @@
+"""
+Cadastro em lote: limite de linhas em NDJSON e falhas de gravação por bloco.
+"""
+
+from sqlalchemy.exc import OperationalError
+
+from app.routers import students
+
+
+def _ndjson(lines):
+    return "\n".join(lines).encode()
+
+
+async def _raise_db_error(*args, **kwargs):
+    raise OperationalError("INSERT", {}, Exception("conexão perdida"))
+
+
+def test_ndjson_over_limit_is_truncated(client, db, monkeypatch):
+    monkeypatch.setattr(students, "STUDENT_BULK_MAX_ROWS", 2)
+    body = _ndjson(["{\"name\": \"\"}"] * 5)
+
+    response = client.post(
+        "/students/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert data["truncated"] == 3
+    assert [result["index"] for result in data["results"]] == [0, 1]
+
+
+def test_failed_chunk_keeps_earlier_results(client, db, monkeypatch):
+    monkeypatch.setattr(students, "STUDENT_BULK_CHUNK_SIZE", 1)
+    calls = []
+    enroll_chunk = students._enroll_chunk
+
+    async def flaky_enroll_chunk(rows, session):
+        calls.append(rows)
+        if len(calls) == 1:
+            return await enroll_chunk(rows, session)
+        # Segundo bloco: o INSERT falha no banco
+        monkeypatch.setattr(session, "execute", _raise_db_error)
+        return await enroll_chunk(rows, session)
+
+    monkeypatch.setattr(students, "_enroll_chunk", flaky_enroll_chunk)
+    body = _ndjson([
+        '{"name": "Ana", "email": "ana@example.com", "cep": "01001000"}',
+        '{"name": "Bia", "email": "bia@example.com", "cep": "01001000"}',
+    ])
+
+    response = client.post(
+        "/students/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json()["results"]]
+    assert statuses == ["created", "error"]
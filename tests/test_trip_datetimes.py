@@ -0,0 +1,83 @@
+"""
+Datas com fuso nas viagens: gravadas e comparadas em UTC sem fuso, como
+as colunas TIMESTAMP (o asyncpg recusa valores com fuso nelas).
+"""
+
+from app.models import Route
+from app.pagination import encode_cursor
+
+
+def _seed_route(db) -> int:
+    route = Route(
+        name="Rota", origin_city="Rio de Janeiro", destination_city="Niterói",
+        origin_city_normalized="rio de janeiro", destination_city_normalized="niteroi",
+        estimated_duration_min=30,
+    )
+    db.add(route)
+    db.commit()
+    return route.id
+
+
+def test_create_trip_with_utc_suffix(client, db):
+    route_id = _seed_route(db)
+
+    response = client.post("/trips/", json={
+        "route_id": route_id, "departure_time": "2030-05-01T08:00:00Z", "available_seats": 40,
+    })
+
+    assert response.status_code == 201
+    assert response.json()["departure_time"] == "2030-05-01T08:00:00"
+    assert response.json()["arrival_time"] == "2030-05-01T08:30:00"
+
+
+def test_offsets_are_converted_to_utc(client, db):
+    route_id = _seed_route(db)
+    trip = client.post("/trips/", json={
+        "route_id": route_id, "departure_time": "2030-05-01T08:00:00+03:00", "available_seats": 40,
+    }).json()
+    assert trip["departure_time"] == "2030-05-01T05:00:00"
+
+    response = client.put(f"/trips/{trip['id']}", json={"departure_time": "2030-05-02T09:00:00-03:00"})
+    assert response.status_code == 200
+    assert response.json()["departure_time"] == "2030-05-02T12:00:00"
+
+    search = client.get("/trips/search", params={
+        "departure_from": "2030-05-02T11:30:00Z", "departure_to": "2030-05-02T10:00:00-03:00",
+    })
+    assert search.status_code == 200
+    assert [item["id"] for item in search.json()] == [trip["id"]]
+
+
+def test_cursor_with_offset(client, db):
+    route_id = _seed_route(db)
+    for hour in (8, 9):
+        client.post("/trips/", json={
+            "route_id": route_id, "departure_time": f"2030-05-01T{hour:02d}:00:00Z", "available_seats": 40,
+        })
+    # 05:30 em -03:00 = 08:30 UTC: só a viagem das 09:00 vem depois
+    cursor = encode_cursor(["2030-05-01T05:30:00-03:00", 0])
+
+    response = client.get(f"/routes/{route_id}/trips", params={"cursor": cursor})
+
+    assert response.status_code == 200
+    assert [item["departure_time"] for item in response.json()] == ["2030-05-01T09:00:00"]
+
+
+def test_timetable_with_offsets(client, db):
+    route_id = _seed_route(db)
+    timetable = {
+        "route_id": route_id, "weekdays": [3], "departure_times": ["22:30:00-03:00", "07:00:00Z"],
+        "start_date": "2030-05-01", "end_date": "2030-05-01", "available_seats": 40,
+    }
+
+    response = client.post("/trips/timetable", json=timetable)
+
+    assert response.status_code == 201
+    assert response.json()["created"] == 2
+    assert response.json()["first_departure"] == "2030-05-01T07:00:00"
+    assert response.json()["last_departure"] == "2030-05-02T01:30:00"
+
+    # Reenviar o quadro não duplica: as partidas já gravadas são puladas
+    again = client.post("/trips/timetable", json=timetable)
+    assert again.json()["created"] == 0
+    assert again.json()["skipped_existing"] == 2